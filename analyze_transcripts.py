@@ -1,13 +1,31 @@
-import sqlite3
+import contextlib
 import json
-from langchain_core.prompts import PromptTemplate
-from langchain_ollama import OllamaLLM
+import time
+import hashlib
+import re
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langchain_ollama import ChatOllama
+import perf
+import storage
 
 # 🔹 Aktuellen Ollama LLM initialisieren
-llm = OllamaLLM(model="llama3.2")  # Modell ggf. anpassen
+MODEL_NAME = "llama3.2"  # Modell ggf. anpassen
+NUM_CTX = 4096           # Kontextfenster pro Aufruf (Prompt + Transkript + Antwort)
+RESPONSE_TOKENS = 256    # obere Grenze für die JSON-Antwort
+KEEP_ALIVE = "30m"       # Modell (und damit der KV-Cache des Prompt-Präfixes) bleibt zwischen den Seiten geladen
+llm = ChatOllama(model=MODEL_NAME, num_ctx=NUM_CTX, num_predict=RESPONSE_TOKENS, keep_alive=KEEP_ALIVE)
+
+# 🔹 Prompts als Chat: fester System-Teil (Anweisungen + Beispiele) + variable Nachricht mit dem Transkript.
+# Der System-Teil ist bei jedem Aufruf identisch, Ollama rechnet ihn nur einmal pro Slot (KV-Präfix-Cache)
+# statt ~1.000 Tokens pro Transkript neu – MAX_CONCURRENCY daher nicht größer als OLLAMA_NUM_PARALLEL wählen.
+TRANSCRIPT_MESSAGE = """Now analyze the following transcript:
+**Transcript**:
+"{transcript}"
+"""
 
 # 🔹 Prompt mit Bewertung + Sponsoring-Erkennung
-prompt = PromptTemplate.from_template("""
+SYSTEM_PROMPT = """
 You are an expert LEGO review analyst. Your task is to classify YouTube LEGO review transcripts. Focus on the *sentiment of the review* and whether the set was likely *provided for free by LEGO*.
 
 Your goals:
@@ -105,13 +123,9 @@ Transcript:
 }}
 ```
 
-Now analyze the following transcript:
-**Transcript**:
-"{transcript}"
-
 ---
 
-Return a response **strictly in this JSON format**:
+Return a response **strictly in this JSON format** for the transcript in the next message:
 
 {{
   "review_category": "<one of: strongly positive, slightly positive, slightly negative, strongly negative>",
@@ -121,104 +135,496 @@ Return a response **strictly in this JSON format**:
 }}
 
 Do not include any other commentary or text. Respond only with a valid JSON object.
-""")
-
-# 🔹 Moderne LangChain-Kette
-chain = prompt | llm
-
-# 🔹 Verbindung zur SQLite-Datenbank
-conn = sqlite3.connect("data/lego_reviews.db")
-cursor = conn.cursor()
-
-# 🔹 Spalten in video_details prüfen und ggf. ergänzen
-required_columns = {
-    "review_category": "TEXT",
-    "review_rationale": "TEXT",
-    "confidence_score": "INTEGER",
-    "sponsored": "BOOLEAN",
-    "transcript_word_count": "INTEGER",
-    "transcript_char_length": "INTEGER"
-}
+"""
 
-cursor.execute("PRAGMA table_info(video_details)")
-existing_columns = {row[1] for row in cursor.fetchall()}
-
-for column, coltype in required_columns.items():
-    if column not in existing_columns:
-        print(f"➕ Spalte '{column}' wird zur Tabelle 'video_details' hinzugefügt...")
-        cursor.execute(f"ALTER TABLE video_details ADD COLUMN {column} {coltype}")
-conn.commit()
-
-# 🔹 Hole bis zu 3 unklassifizierte Transkripte
-cursor.execute("""
-    SELECT v.video_id, v.title, d.transcript
-    FROM videos v
-    JOIN video_details d ON v.video_id = d.video_id
-    WHERE d.review_category IS NULL AND d.transcript IS NOT NULL
-    LIMIT 50
-""")
-rows = cursor.fetchall()
-
-# 🔹 Übersicht aller geladenen Videos
-print("\n📋 Geladene Videos mit Transkript:\n")
-for idx, (video_id, title, _) in enumerate(rows, start=1):
-    print(f"{idx}. {title} (ID: {video_id})")
-
-if not rows:
-    print("\n❗ Keine unklassifizierten Transkripte gefunden.")
-else:
-    print("\n🚀 Starte Analyse...\n")
-
-    for idx, (video_id, title, transcript) in enumerate(rows, start=1):
-        print("=" * 80)
-        print(f"🔍 Video {idx}: {title}")
-        print(f"🆔 ID: {video_id}\n")
-
-        clean_transcript = transcript.strip()
-        char_length = len(clean_transcript)
-        word_count = len(clean_transcript.split())
-
-        print("📝 Transkript-Auszug:")
-        print(clean_transcript[:500] + ("..." if len(clean_transcript) > 500 else ""))
-        print(f"\n🧮 Länge des Transkripts: {char_length} Zeichen / {word_count} Wörter")
+# 🔹 Kurzer Prompt nur für das Sentiment (Sponsoring bereits per Regel erkannt)
+SENTIMENT_SYSTEM_PROMPT = """
+You are an expert LEGO review analyst. Classify the overall sentiment of the YouTube LEGO review transcript in the next message into exactly one category:
 
-        if char_length < 100:
-            print("⚠️ Transkript ist sehr kurz – möglicherweise nicht aussagekräftig.")
+- "strongly positive": Clear recommendation, enthusiastic praise, almost no criticism.
+- "slightly positive": Mostly positive with some reservations or minor criticism.
+- "slightly negative": Neutral or mixed impression with notable criticism.
+- "strongly negative": Reviewer discourages purchase or expresses strong disappointment.
+
+Also provide a `confidence_score` between 0 and 100.
+
+Return only a valid JSON object in this format:
+
+{{
+  "review_category": "<one of: strongly positive, slightly positive, slightly negative, strongly negative>",
+  "review_rationale": "<short explanation in English>",
+  "confidence_score": <value from 0 to 100>
+}}
+"""
+
+# 🔹 Kompakte Varianten ohne Beispiele (~150 statt ~1.000 Tokens Präfix), das JSON-Schema hält das Format ein
+LITE_SYSTEM_PROMPT = """
+You classify YouTube LEGO review transcripts. Answer with one JSON object only:
+- "review_category": "strongly positive" (clear recommendation, almost no criticism), "slightly positive" (mostly positive, minor criticism), "slightly negative" (mixed, notable criticism) or "strongly negative" (discourages purchase, strong disappointment)
+- "review_rationale": one short sentence in English
+- "confidence_score": 0 to 100, how sure you are about the category
+- "sponsored": true if anything suggests LEGO provided the set (sent, gifted or early copy, LEGO Ambassador Network / LAN, review copy, LEGO asked for the review), otherwise false
+"""
+
+LITE_SENTIMENT_SYSTEM_PROMPT = """
+You classify the sentiment of YouTube LEGO review transcripts. Answer with one JSON object only:
+- "review_category": "strongly positive" (clear recommendation, almost no criticism), "slightly positive" (mostly positive, minor criticism), "slightly negative" (mixed, notable criticism) or "strongly negative" (discourages purchase, strong disappointment)
+- "review_rationale": one short sentence in English
+- "confidence_score": 0 to 100, how sure you are about the category
+"""
+
+# "full": Anweisungen mit Beispielen, "lite": kompakte Variante (eigene Prompt-Version, also eigener Cache)
+PROMPT_VARIANT = "full"
+
+def chat_prompt(system_prompt):
+    return ChatPromptTemplate.from_messages([("system", system_prompt), ("human", TRANSCRIPT_MESSAGE)])
+
+PROMPTS = {
+    "full": (chat_prompt(SYSTEM_PROMPT), chat_prompt(SENTIMENT_SYSTEM_PROMPT)),
+    "lite": (chat_prompt(LITE_SYSTEM_PROMPT), chat_prompt(LITE_SENTIMENT_SYSTEM_PROMPT)),
+}
+prompt, sentiment_prompt = PROMPTS[PROMPT_VARIANT]
+
+def prompt_text(template):
+    return "\n".join(message.prompt.template for message in template.messages)
+
+# 🔹 Strukturierte Ausgabe: Ollama (>= 0.5) erzwingt per JSON-Schema genau diese Felder
+CATEGORY_VALUES = ["strongly positive", "slightly positive", "slightly negative", "strongly negative"]
+SENTIMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "review_category": {"type": "string", "enum": CATEGORY_VALUES},
+        "review_rationale": {"type": "string"},
+        "confidence_score": {"type": "integer", "minimum": 0, "maximum": 100},
+    },
+    "required": ["review_category", "review_rationale", "confidence_score"],
+}
+RESPONSE_SCHEMA = {
+    **SENTIMENT_SCHEMA,
+    "properties": {**SENTIMENT_SCHEMA["properties"], "sponsored": {"type": "boolean"}},
+    "required": [*SENTIMENT_SCHEMA["required"], "sponsored"],
+}
+MAX_RETRIES = 1  # nur Antworten ohne verwertbares JSON-Objekt werden noch einmal angefragt
+
+# 🔹 Tolerantes Auslesen: Code-Fences, Text vor/nach dem Objekt und hängende Kommas werden repariert
+FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_json_decoder = json.JSONDecoder()
+
+def extract_json(text):
+    text = FENCE_PATTERN.sub("", text)
+    for candidate in (text, TRAILING_COMMA_PATTERN.sub(r"\1", text)):
+        start = candidate.find("{")
+        while start != -1:
+            try:
+                result, _ = _json_decoder.raw_decode(candidate, start)
+                if isinstance(result, dict):
+                    return result
+            except json.JSONDecodeError:
+                pass
+            start = candidate.find("{", start + 1)
+    raise json.JSONDecodeError("kein JSON-Objekt in der Antwort", text, 0)
+
+def is_valid_result(result, schema):
+    return all(result.get(field) is not None for field in schema["required"]) and result["review_category"] in CATEGORY_VALUES
+
+# 🔹 Antwort streamen und abbrechen, sobald ein vollständiges Objekt da ist
+# (im JSON-Modus hängen manche Modelle sonst Leerzeichen bis num_predict an – das Schließen des Streams beendet die Generierung)
+# usage: Tokenzählung des Servers (usage_metadata aus prompt_eval_count / eval_count), die erst im letzten Chunk kommt –
+# nach dem Objekt werden daher noch bis zu USAGE_GRACE_CHUNKS Chunks gelesen; ein Modell, das normal endet, liefert ihn
+# sofort, eines, das Leerzeichen anhängt, wird danach abgebrochen. Fehlt die Zählung, zählt output_tokens die Chunks
+# (Ollama streamt ein Token pro Chunk)
+USAGE_GRACE_CHUNKS = 3
+
+def stream_json(llm, messages, schema):
+    response, pieces, usage, result, grace = "", 0, {}, None, USAGE_GRACE_CHUNKS
+    with contextlib.closing(llm.stream(messages, format=schema)) as chunks:
+        for chunk in chunks:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            text = getattr(chunk, "content", chunk)  # Chat-Modelle liefern Message-Chunks
+            pieces += bool(text)
+            if result is not None:
+                grace -= 1
+                if usage or grace <= 0:
+                    break
+                continue
+            response += text
+            if "}" in text:
+                try:
+                    result = extract_json(response)
+                except json.JSONDecodeError:
+                    continue
+    if result is None:
+        result = extract_json(response)
+    return result, response, {"output_tokens": pieces, **usage}
+
+def classify_structured(inputs, max_retries=MAX_RETRIES):
+    short = inputs.get("sentiment_only", False)
+    template, schema = (sentiment_prompt, SENTIMENT_SCHEMA) if short else (prompt, RESPONSE_SCHEMA)
+    messages = template.format_messages(transcript=inputs["transcript"])
+    for attempt in range(max_retries + 1):
+        response = ""
+        try:
+            result, response, usage = stream_json(llm, messages, schema)
+            if is_valid_result(result, schema):
+                return {**result, "token_usage": usage}
+            error = ValueError(f"unvollständige Antwort: {response[:200]!r}")
+        except json.JSONDecodeError as e:
+            error = e
+        if attempt < max_retries:
+            print(f"🔁 Antwort unbrauchbar ({error}), neuer Versuch...")
+    raise error
+
+# 🔹 Klassifizierer für classify_page: {"transcript", "sentiment_only"} -> dict mit den Feldern des Schemas
+classifier = RunnableLambda(classify_structured)
+
+# 🔹 Prompt-Version: ändert sich automatisch, sobald der Prompt-Text angepasst wird
+PROMPT_VERSION = hashlib.sha256(prompt_text(prompt).encode("utf-8")).hexdigest()[:12]
+SENTIMENT_PROMPT_VERSION = hashlib.sha256(prompt_text(sentiment_prompt).encode("utf-8")).hexdigest()[:12]
+
+# 🔹 Regelbasierte Sponsoring-Erkennung vor dem LLM-Aufruf
+# "off": nur LLM, "full": LLM bekommt den vollen Prompt und entscheidet, die Regel wird nur in sponsor_rule vermerkt,
+# "confident": eindeutige Regeln (CONFIDENT_SPONSOR_RULES) setzen sponsored, das LLM bekommt nur den kurzen
+#              Sentiment-Prompt; schwächere Treffer werden wie bei "full" nur vermerkt,
+# "sentiment_only": jede Regel setzt sponsored, LLM bekommt nur den kurzen Sentiment-Prompt (schneller, aber ohne Korrektur)
+SPONSOR_PREFILTER_MODE = "confident"
+NEGATION_WINDOW_WORDS = 4  # "not", "no", "never" ... so viele Wörter vor einem Treffer im selben Satzteil heben ihn auf
+SPONSOR_RULES = {
+    "thanks_for_sending": r"thanks?(?: you)? (?:to )?(?:the )?lego(?: group)? for (?:sending|providing|gifting)",
+    "provided_by_lego": r"(?:provided|sent|supplied|gifted) (?:to (?:me|us) )?by (?:the )?lego(?: group)?\b",
+    "lego_sent_me": r"\blego(?: group)? (?:sent|gave|provided) (?:me|us)\b(?! (?:nothing|anything)\b)",
+    "lego_asked_me": r"\blego asked (?:me|us) to review",
+    "ambassador_network": r"lego ambassador network|\b(?:through|via|from) the lan\b",
+    "review_copy": r"\breview (?:copy|sample|unit)\b",
+}
+# Formulierungen, die kaum anders als "LEGO hat das Set gestellt" zu lesen sind; "review copy" oder "the LAN"
+# kommen auch in anderem Zusammenhang vor und bleiben dem LLM überlassen
+CONFIDENT_SPONSOR_RULES = {"thanks_for_sending", "provided_by_lego", "lego_sent_me", "lego_asked_me"}
+SPONSOR_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in SPONSOR_RULES.items()),
+    re.IGNORECASE
+)
+NEGATION_PATTERN = re.compile(r"(?:\b(?:not|no|never|without|nothing)|n't)\b", re.IGNORECASE)
+# eine Verneinung gilt nur bis zur Satzteilgrenze: "I can't wait, LEGO sent me this set" ist kein Dementi
+CLAUSE_BOUNDARY_PATTERN = re.compile(r"[,;:.!?()\u2013\u2014]|\b(?:but|and|so|because)\b", re.IGNORECASE)
+
+def is_negated(text, start, window=NEGATION_WINDOW_WORDS):
+    preceding = text[max(0, start - 20 * window):start]
+    clause = CLAUSE_BOUNDARY_PATTERN.split(preceding)[-1]
+    return bool(NEGATION_PATTERN.search(" ".join(clause.split()[-window:])))
+
+def detect_sponsorship(*texts):
+    for text in texts:
+        for match in SPONSOR_PATTERN.finditer(text or ""):
+            if not is_negated(text, match.start()):
+                return match.lastgroup
+    return None
+
+# 🔹 Batch-Einstellungen
+DB_PATH = storage.DB_PATH
+MAX_CONCURRENCY = 4   # parallele Anfragen an den Ollama-Server
+PAGE_SIZE = 50        # Transkripte pro Seite / pro Datenbank-Commit
+CACHE_MAX_ENTRIES = 100_000  # älteste (zuletzt ungenutzte) Cache-Einträge werden darüber hinaus gelöscht
+
+# 🔹 Token-Budget: lange Transkripte werden in überlappende Abschnitte geteilt
+CHARS_PER_TOKEN = 4   # grobe Schätzung, reicht für die Budgetierung
+CHUNK_OVERLAP_TOKENS = 150
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def call_tokens(text, result):
+    # gemessene Zählung aus classify_structured, wo sie fehlt (Abbruch, anderes Runnable) die Schätzung;
+    # input_tokens zählt nur den neu ausgewerteten Teil, ein vom Server gecachter Prompt-Präfix fehlt darin
+    if isinstance(result, Exception):
+        return PROMPT_TOKENS + estimate_tokens(text)
+    usage = result.get("token_usage", {}) if isinstance(result, dict) else {}
+    input_tokens = usage.get("input_tokens")
+    output_tokens = usage.get("output_tokens")
+    if input_tokens is None:
+        input_tokens = PROMPT_TOKENS + estimate_tokens(text)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(result if isinstance(result, str) else json.dumps(result))
+    return input_tokens + output_tokens
+
+PROMPT_TOKENS = estimate_tokens(prompt_text(prompt))
+MAX_TRANSCRIPT_TOKENS = NUM_CTX - PROMPT_TOKENS - RESPONSE_TOKENS  # passt noch in einen einzelnen Aufruf
+
+# 🔹 Ergebnis-Cache (Tabelle classification_cache, siehe storage.py): Schlüssel = Hash(normalisiertes Transkript, Prompt-Version, Modell)
+# der Transkript-Hash wird beim Import in video_details.transcript_hash gespeichert (storage.transcript_stats)
+def cache_key(transcript_hash, prompt_version=PROMPT_VERSION, model_name=MODEL_NAME):
+    return hashlib.sha256(f"{transcript_hash}:{prompt_version}:{model_name}".encode("utf-8")).hexdigest()
+
+def lookup_cached(conn, keys):
+    if not keys:
+        return {}
+    placeholders = ",".join(["?"] * len(keys))
+    cached = dict(conn.execute(
+        f"SELECT cache_key, result FROM classification_cache WHERE cache_key IN ({placeholders})", keys
+    ).fetchall())
+    now = time.time()
+    # sofort committen: sonst hielte die offene Transaktion die Schreibsperre während der LLM-Aufrufe
+    with conn:
+        conn.executemany("UPDATE classification_cache SET last_used_at = ? WHERE cache_key = ?", [(now, key) for key in cached])
+    return {key: json.loads(result) for key, result in cached.items()}
+
+def store_cached(conn, entries, max_entries=CACHE_MAX_ENTRIES):
+    now = time.time()
+    conn.executemany("""
+        INSERT OR REPLACE INTO classification_cache (cache_key, result, created_at, last_used_at)
+        VALUES (?, ?, ?, ?)
+    """, [(key, json.dumps(result, ensure_ascii=False), now, now) for key, result in entries])
+    overflow = conn.execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0] - max_entries
+    if overflow > 0:
+        conn.execute("""
+            DELETE FROM classification_cache WHERE cache_key IN (
+                SELECT cache_key FROM classification_cache ORDER BY last_used_at LIMIT ?
+            )
+        """, (overflow,))
+
+# 🔹 Unklassifizierte Videos seitenweise laden (Keyset-Pagination über video_id, ohne Transkript-Text)
+UNCLASSIFIED_QUERY = """
+    SELECT d.video_id, v.title, d.transcript_hash, d.transcript_char_length
+    FROM video_details d
+    JOIN videos v ON v.video_id = d.video_id
+    WHERE d.review_category IS NULL AND d.transcript_hash IS NOT NULL
+"""
+
+def iter_unclassified(conn, page_size=PAGE_SIZE):
+    last_id = ""
+    while True:
+        rows = conn.execute(UNCLASSIFIED_QUERY + " AND d.video_id > ? ORDER BY d.video_id LIMIT ?", (last_id, page_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+# 🔹 Dieselben Zeilen für eine feste Liste von Videos (Pipeline-Stufe "classify")
+def unclassified_rows(conn, video_ids):
+    video_ids = list(video_ids)
+    placeholders = ",".join(["?"] * len(video_ids))
+    return conn.execute(UNCLASSIFIED_QUERY + f" AND d.video_id IN ({placeholders}) ORDER BY d.video_id", video_ids).fetchall()
+
+# 🔹 LLM-Antwort prüfen, liefert die vier Felder oder None
+def parse_result(result):
+    if isinstance(result, str):
+        result = extract_json(result)
+    review_category = result.get("review_category")
+    review_rationale = result.get("review_rationale")
+    confidence_score = result.get("confidence_score")
+    sponsored = result.get("sponsored")
+    if review_category and review_rationale is not None and confidence_score is not None and sponsored is not None:
+        return review_category, review_rationale, int(confidence_score), int(sponsored)
+    return None
+
+# 🔹 Transkript in überlappende Abschnitte mit höchstens chunk_tokens Tokens teilen
+def split_transcript(transcript, chunk_tokens=MAX_TRANSCRIPT_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    words = transcript.split()
+    chunk_chars = chunk_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    chunks = []
+    start = 0
+    while start < len(words):
+        end, size = start, 0
+        while end < len(words) and size + len(words[end]) + 1 <= chunk_chars:
+            size += len(words[end]) + 1
+            end += 1
+        end = max(end, start + 1)
+        chunks.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+        # ein Stück zurückgehen, damit Sätze an der Grenze in beiden Abschnitten stehen
+        back, size = end, 0
+        while back > start + 1 and size < overlap_chars:
+            back -= 1
+            size += len(words[back]) + 1
+        start = back
+    return chunks
+
+# 🔹 Abschnitts-Ergebnisse zu einer Gesamtbewertung zusammenführen
+score_map = {
+    "strongly negative": 1,
+    "slightly negative": 2,
+    "slightly positive": 3,
+    "strongly positive": 4
+}
 
+def reduce_chunk_results(chunk_results):
+    parsed = []
+    for result in chunk_results:
+        if isinstance(result, Exception):
+            continue
         try:
-            result = chain.invoke({"transcript": clean_transcript})
-
-            # Falls das Modell einen JSON-String liefert, parsen
-            if isinstance(result, str):
-                result = json.loads(result)
-
-            print("\n✅ Strukturierte JSON-Antwort:")
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-
-            # 🔹 Werte extrahieren
-            review_category = result.get("review_category")
-            review_rationale = result.get("review_rationale")
-            confidence_score = result.get("confidence_score")
-            sponsored = result.get("sponsored")
-
-            if review_category and review_rationale is not None and confidence_score is not None and sponsored is not None:
-                # 🔸 In Tabelle video_details schreiben
-                cursor.execute("""
-                    UPDATE video_details
-                    SET review_category = ?, review_rationale = ?, confidence_score = ?, sponsored = ?, transcript_word_count = ?, transcript_char_length = ?
-                    WHERE video_id = ?
-                """, (review_category, review_rationale, int(confidence_score), int(sponsored), word_count, char_length, video_id))
-                conn.commit()
-
-                print(f"\n💾 Datenbank aktualisiert für Video {video_id}")
+            fields = parse_result(result)
+        except Exception:
+            continue
+        if fields is not None and fields[0] in score_map:
+            parsed.append(fields)
+    if not parsed:
+        raise ValueError(f"keiner von {len(chunk_results)} Abschnitten lieferte eine gültige Antwort")
+
+    # Sentiment: nach Konfidenz gewichteter Mittelwert der Abschnitte, Sponsoring: ein Treffer genügt
+    weights = [max(confidence, 1) for _, _, confidence, _ in parsed]
+    score = sum(score_map[category] * weight for (category, _, _, _), weight in zip(parsed, weights)) / sum(weights)
+    review_category = min(score_map, key=lambda category: abs(score_map[category] - score))
+    best = max(parsed, key=lambda fields: (fields[0] == review_category, fields[2]))
+    return {
+        "review_category": review_category,
+        "review_rationale": f"{best[1]} (aus {len(parsed)} Abschnitten zusammengefasst)",
+        "confidence_score": round(sum(confidence for _, _, confidence, _ in parsed) / len(parsed)),
+        "sponsored": any(sponsored for _, _, _, sponsored in parsed)
+    }
+
+# 🔹 Antwort des Sentiment-Prompts um das per Regel erkannte Sponsoring ergänzen
+def mark_sponsored(result):
+    if isinstance(result, Exception):
+        return result
+    try:
+        if isinstance(result, str):
+            result = extract_json(result)
+        return {**result, "sponsored": True}
+    except Exception as e:
+        return e
+
+# 🔹 Eine Seite parallel klassifizieren (Cache-Treffer ohne LLM) und gesammelt speichern
+def classify_page(conn, rows, runnable=classifier, max_concurrency=MAX_CONCURRENCY, stats=None,
+                  prefilter_mode=SPONSOR_PREFILTER_MODE):
+    # Texte (description, transcript) erst hier und nur für diese Seite entpacken
+    texts = storage.load_transcripts(conn, [video_id for video_id, _, _, _ in rows]) if prefilter_mode != "off" else {}
+    rules = [
+        detect_sponsorship(*texts[video_id][::-1]) if prefilter_mode != "off" else None
+        for video_id, _, _, _ in rows
+    ]
+    sentiment_only = [
+        rule is not None and (prefilter_mode == "sentiment_only"
+                              or prefilter_mode == "confident" and rule in CONFIDENT_SPONSOR_RULES)
+        for rule in rules
+    ]
+    keys = [
+        cache_key(transcript_hash, SENTIMENT_PROMPT_VERSION if short else PROMPT_VERSION)
+        for (_, _, transcript_hash, _), short in zip(rows, sentiment_only)
+    ]
+    results = [None] * len(rows)
+    cached = lookup_cached(conn, keys)
+    misses = {}  # gleiche Transkripte innerhalb einer Seite nur einmal an das LLM schicken
+    for idx, key in enumerate(keys):
+        if key in cached:
+            results[idx] = cached[key]
+        else:
+            misses.setdefault(key, (rows[idx][0], sentiment_only[idx]))
+
+    if misses:
+        # ohne Vorfilter werden nur die Texte der Cache-Fehlschläge geladen
+        texts.update(storage.load_transcripts(conn, [video_id for video_id, _ in misses.values() if video_id not in texts]))
+        # kurze Transkripte = ein Aufruf, lange = ein Aufruf pro Abschnitt (alle im selben Batch)
+        calls = []
+        for key, (video_id, short) in misses.items():
+            transcript = texts[video_id][1].strip()
+            if estimate_tokens(transcript) <= MAX_TRANSCRIPT_TOKENS:
+                calls.append((key, transcript, short, False))
+            else:
+                chunks = split_transcript(transcript)
+                print(f"✂️ Langes Transkript ({estimate_tokens(transcript)} Tokens) wird in {len(chunks)} Abschnitte geteilt")
+                calls.extend((key, chunk, short, True) for chunk in chunks)
+
+        # ⏱️ Tokens pro Aufruf aus der Antwort von ChatOllama, geschätzt nur wo die Zählung fehlt (call_tokens)
+        with perf.timer("llm.batch", items=len(calls)) as timing:
+            call_results = runnable.batch(
+                [{"transcript": text, "sentiment_only": short} for _, text, short, _ in calls],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            )
+            timing.tokens = sum(call_tokens(text, result) for (_, text, _, _), result in zip(calls, call_results))
+        llm_results, chunk_results = {}, {}
+        for (key, _, short, chunked), result in zip(calls, call_results):
+            if short:
+                result = mark_sponsored(result)
+            if chunked:
+                chunk_results.setdefault(key, []).append(result)
             else:
-                print("⚠️ LLM-Antwort war unvollständig – nichts gespeichert.")
+                llm_results[key] = result
+        for key, partial in chunk_results.items():
+            try:
+                llm_results[key] = reduce_chunk_results(partial)
+            except ValueError as e:
+                llm_results[key] = e
+        for idx, key in enumerate(keys):
+            if key in llm_results:
+                results[idx] = llm_results[key]
+    if stats is not None:
+        stats["hits"] += len(rows) - len(misses)
+        stats["misses"] += len(misses)
+        stats["rule_matches"] += sum(rule is not None for rule in rules)
+
+    updates = []
+    new_cache_entries = []
+    for (video_id, title, _, char_length), key, rule, short, result in zip(rows, keys, rules, sentiment_only, results):
+        if char_length < 100:
+            print(f"⚠️ Transkript von {video_id} ist sehr kurz – möglicherweise nicht aussagekräftig.")
 
+        if isinstance(result, Exception):
+            print(f"❌ Fehler bei Analyse von {video_id}: {result}")
+            continue
+        try:
+            fields = parse_result(result)
         except json.JSONDecodeError:
-            print("\n⚠️ Antwort war kein gültiges JSON.")
-            print("Antwort:")
-            print(result)
+            print(f"⚠️ Antwort für {video_id} war kein gültiges JSON: {result[:200]!r}")
+            continue
         except Exception as e:
-            print(f"\n❌ Fehler bei Analyse von {video_id}: {e}")
-
-        print("\n")
+            print(f"❌ Fehler bei Analyse von {video_id}: {e}")
+            continue
+        if fields is None:
+            print(f"⚠️ LLM-Antwort für {video_id} war unvollständig – nichts gespeichert.")
+            continue
+
+        if key not in cached:
+            review_category, review_rationale, confidence_score, sponsored = fields
+            new_cache_entries.append((key, {
+                "review_category": review_category,
+                "review_rationale": review_rationale,
+                "confidence_score": confidence_score,
+                "sponsored": bool(sponsored)
+            }))
+        if short:
+            # bei sicheren Regeln (bzw. im Modus sentiment_only bei jeder) entscheidet die Regel, sonst das LLM
+            fields = (*fields[:3], 1)
+
+        rule_note = f" (Regel: {rule})" if rule else ""
+        print(f"✅ {title} ({video_id}): {fields[0]}, Konfidenz {fields[2]}, gesponsert: {bool(fields[3])}{rule_note}")
+        updates.append((*fields, rule, video_id))
+
+    with perf.timer("db.classifications", items=len(updates)):
+        conn.executemany("""
+            UPDATE video_details
+            SET review_category = ?, review_rationale = ?, confidence_score = ?, sponsored = ?, sponsor_rule = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = ?
+        """, updates)
+        store_cached(conn, new_cache_entries)
+        conn.commit()
+    return len(updates)
+
+# 🔹 Gesamten unklassifizierten Bestand abarbeiten
+def analyze_backlog(conn, runnable=classifier, max_concurrency=MAX_CONCURRENCY, page_size=PAGE_SIZE):
+    start_time = time.time()
+    processed = stored = 0
+    stats = {"hits": 0, "misses": 0, "rule_matches": 0}
+    for page in iter_unclassified(conn, page_size):
+        print(f"\n🚀 Analysiere {len(page)} Transkripte (max. {max_concurrency} parallel)...")
+        stored += classify_page(conn, page, runnable, max_concurrency, stats)
+        processed += len(page)
+        elapsed = time.time() - start_time
+        print(f"💾 {stored}/{processed} gespeichert – {processed / elapsed:.2f} Transkripte/s")
+
+    if not processed:
+        print("\n❗ Keine unklassifizierten Transkripte gefunden.")
+    else:
+        print(f"\n🗄️ Cache: {stats['hits']} Treffer, {stats['misses']} LLM-Aufrufe")
+        print(f"🎁 Sponsoring per Regel erkannt: {stats['rule_matches']} Videos (Modus: {SPONSOR_PREFILTER_MODE})")
+    return processed, stored
+
+if __name__ == "__main__":
+    # 🔹 Verbindung zur SQLite-Datenbank
+    conn = storage.connect(DB_PATH)
+    analyze_backlog(conn)
+    conn.close()
+    perf.export("analyze_transcripts")
@@ -0,0 +1,69 @@
+"""json3 captions: response.json() + join vs. the streaming segment parser in yt_extract.
+
+    python -m benchmarks.bench_caption_parser --minutes 180
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import storage
+from benchmarks.synthetic_db import WORDS
+from yt_extract import CAPTION_CHUNK_SIZE, iter_caption_segments
+
+def synthetic_json3(minutes, seed=42):
+    """Payload shaped like YouTube auto-captions: one event per ~2 s, a few word segments each."""
+    rng = random.Random(seed)
+    events = [{"tStartMs": 0, "dDurationMs": minutes * 60_000, "id": 1, "wpWinPosId": 1, "wsWinStyleId": 1}]
+    for start in range(0, minutes * 60_000, 2000):
+        segs = [{"utf8": rng.choice(WORDS)}] + [
+            {"utf8": f" {rng.choice(WORDS)}", "tOffsetMs": offset, "acAsrConf": 0} for offset in range(240, 1900, 240)
+        ]
+        events.append({"tStartMs": start, "dDurationMs": 2000, "wWinId": 1, "segs": segs})
+        events.append({"tStartMs": start + 1990, "dDurationMs": 10, "wWinId": 1, "aAppend": 1, "segs": [{"utf8": "\n"}]})
+    payload = {"wireMagic": "pb3", "pens": [{}], "wsWinStyles": [{}, {"mhModeHint": 2}], "wpWinPositions": [{}], "events": events}
+    return json.dumps(payload).encode("utf-8")
+
+def whole_payload(payload):
+    # the parser before streaming: response.json() on the full body, joined right away
+    data = json.loads(payload)
+    segments = []
+    for event in data.get("events", []):
+        for seg in event.get("segs", []):
+            segments.append(seg.get("utf8", "").replace("\n", " "))
+    return " ".join(segments).strip()
+
+def streamed(payload):
+    chunks = (payload[i:i + CAPTION_CHUNK_SIZE] for i in range(0, len(payload), CAPTION_CHUNK_SIZE))
+    return list(iter_caption_segments(chunks))
+
+def measure(parse, payload):
+    start = time.perf_counter()
+    result = parse(payload)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    parse(payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=180)
+    args = parser.parse_args()
+
+    payload = synthetic_json3(args.minutes)
+    print(f"📄 {args.minutes} min of captions, json3 payload {len(payload) / 2**20:.1f} MiB")
+    # the payload itself is not counted, only what the parser allocates
+    elapsed, peak, text = measure(whole_payload, payload)
+    print(f"{'response.json() + join':<28} {elapsed * 1000:8.1f} ms   peak {peak / 2**20:7.1f} MiB")
+    elapsed, peak, segments = measure(streamed, payload)
+    print(f"{'streaming events':<28} {elapsed * 1000:8.1f} ms   peak {peak / 2**20:7.1f} MiB   {len(segments):,} events")
+
+    assert storage.transcript_hash(storage.join_segments(segments)) == storage.transcript_hash(text)
+    blob = storage.encode_segments(segments)
+    print(f"💾 stored segments (zlib) {len(blob) / 2**10:.0f} KiB vs. joined text (zlib) {len(storage.compress_text(text)) / 2**10:.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Dashboard loader: three SELECT * reads + pandas merges vs. one projected and filtered SQL query.
+
+    python -m benchmarks.bench_loader --videos 1000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic_db import create_synthetic_db
+from dashboard_data import prepare_data, score_map
+
+def legacy_prepare_data(db_path):
+    # the loader as it was before the SQL projection, kept here as the baseline
+    conn = sqlite3.connect(db_path)
+    df_videos = pd.read_sql_query("SELECT * FROM videos", conn)
+    df_video_details = pd.read_sql_query("SELECT * FROM video_details", conn)
+    df_legosets = pd.read_sql_query("SELECT * FROM legosets", conn)
+    conn.close()
+
+    df = pd.merge(df_videos, df_video_details, on="video_id", how="left")
+    df = pd.merge(df, df_legosets, left_on="lego_number", right_on="Number", how="left")
+
+    df['upload_date'] = pd.to_datetime(df['upload_date'], errors='coerce')
+    df['LaunchDate'] = pd.to_datetime(df['LaunchDate'], errors='coerce')
+    int_cols = ['confidence_score', 'views', 'transcript_word_count', 'transcript_char_length']
+    for col in int_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    df['sponsored'] = df['sponsored'].astype(bool)
+
+    filtered = df[
+        (df['PackagingType'].str.lower() == 'box') &
+        (df['upload_date'] >= pd.Timestamp('2023-01-01')) &
+        (df['LaunchDate'].notna()) &
+        ((df['LaunchDate'] - df['upload_date']).dt.days <= 183)
+    ].copy()
+
+    filtered['upload_week_start'] = filtered['upload_date'] - pd.to_timedelta(filtered['upload_date'].dt.weekday, unit='D')
+    filtered['upload_week_label'] = filtered['upload_week_start'].dt.strftime('%Y-W%U')
+    filtered['release_year'] = filtered['LaunchDate'].dt.year
+    filtered['review_score'] = filtered['review_category'].map(score_map)
+    return filtered
+
+def measure(loader, db_path):
+    # timing and memory are measured in separate runs, tracemalloc slows down allocation-heavy code
+    start = time.perf_counter()
+    df = loader(db_path)
+    elapsed = time.perf_counter() - start
+    del df
+    tracemalloc.start()
+    rows = len(loader(db_path))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=100_000)
+    parser.add_argument("--transcript-chars", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"⏳ Generating {args.videos:,} synthetic videos...")
+        create_synthetic_db(db_path, args.videos, transcript_chars=args.transcript_chars)
+        prepare_data(db_path)  # creates the indexes once, like the first dashboard start
+
+        for name, loader in [("legacy SELECT * + merge", legacy_prepare_data), ("projected SQL query", prepare_data)]:
+            elapsed, peak, rows = measure(loader, db_path)
+            print(f"{name:<26} {elapsed:8.2f} s   peak {peak / 2**20:9.1f} MiB   {rows:,} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Prompt prefix reuse: one prompt with the transcript in the middle vs. fixed system prefix + transcript message (full / lite).
+
+    python -m benchmarks.bench_prompt_prefix --items 200 --eval-ms-per-token 0.5
+
+The analyzer talks to a local stub of Ollama's /api/chat. Like the real server, the stub keeps the tokens of
+the last prompt per slot (--slots, OLLAMA_NUM_PARALLEL). It only "evaluates" the part after the longest
+common prefix, sleeping --eval-ms-per-token per evaluated token, and records sent and evaluated prompt tokens.
+Tokens are approximated as words and punctuation marks.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import HumanMessage
+from langchain_ollama import ChatOllama
+
+import analyze_transcripts
+from benchmarks.synthetic_db import WORDS
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTIMENT_ONLY_SHARE = 0.2  # transcripts the sponsor rules already matched (short prompt)
+
+class StubOllama:
+    """Ollama /api/chat stub with a per-slot KV prefix cache."""
+
+    def __init__(self, slots, eval_ms_per_token):
+        self.eval_seconds = eval_ms_per_token / 1000
+        self.slots = [[] for _ in range(slots)]
+        self.free = set(range(slots))
+        self.requests = []  # (sent tokens, evaluated tokens, keep_alive)
+        self.condition = threading.Condition()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.handle(self, body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def acquire_slot(self, tokens):
+        # like the server: the free slot sharing the longest prefix with this prompt
+        with self.condition:
+            while not self.free:
+                self.condition.wait()
+            slot = max(self.free, key=lambda index: common_prefix(self.slots[index], tokens))
+            self.free.remove(slot)
+            return slot, common_prefix(self.slots[slot], tokens)
+
+    def release_slot(self, slot, tokens):
+        with self.condition:
+            self.slots[slot] = tokens
+            self.free.add(slot)
+            self.condition.notify()
+
+    def handle(self, request, body):
+        rendered = "".join(f"<|{message['role']}|>\n{message['content']}<|end|>\n" for message in body["messages"])
+        tokens = TOKEN_PATTERN.findall(rendered + "<|assistant|>\n")
+        slot, cached = self.acquire_slot(tokens) if self.slots else (None, 0)
+        time.sleep((len(tokens) - cached) * self.eval_seconds)
+        if slot is not None:
+            self.release_slot(slot, tokens)
+        with self.condition:
+            self.requests.append((len(tokens), len(tokens) - cached, body.get("keep_alive")))
+
+        answer = {"review_category": "slightly positive", "review_rationale": "stub", "confidence_score": 80}
+        if "sponsored" in (body.get("format") or {}).get("required", []):
+            answer["sponsored"] = False
+        pieces = re.findall(r".{1,8}", json.dumps(answer)) + ["\n"] * 20  # trailing whitespace, cut by the early stop
+        request.send_response(200)
+        request.send_header("Content-Type", "application/x-ndjson")
+        request.end_headers()
+        try:
+            for piece in pieces:
+                request.wfile.write((json.dumps({"model": body["model"], "created_at": "2025-01-01T00:00:00Z",
+                                                 "message": {"role": "assistant", "content": piece}, "done": False})
+                                     + "\n").encode("utf-8"))
+                request.wfile.flush()
+            request.wfile.write((json.dumps({"model": body["model"], "created_at": "2025-01-01T00:00:00Z",
+                                             "message": {"role": "assistant", "content": ""}, "done": True,
+                                             "done_reason": "stop", "prompt_eval_count": len(tokens) - cached,
+                                             "eval_count": len(pieces)}) + "\n").encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading after the complete object
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def common_prefix(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+def legacy_messages(inputs):
+    # the PromptTemplate before the split: instructions, transcript, then the format section, as one message
+    template = analyze_transcripts.PROMPTS["full"][1 if inputs["sentiment_only"] else 0]
+    system, transcript = template.format_messages(transcript=inputs["transcript"])
+    head, separator, tail = system.content.rpartition("\n---\n\nReturn ")
+    if not separator:  # sentiment prompt: the format section starts with "Return only"
+        head, separator, tail = system.content.rpartition("\nReturn ")
+    return [HumanMessage(f"{head}\n{transcript.content}{separator}{tail}")]
+
+def workload(items, seed=7):
+    rng = random.Random(seed)
+    return [{
+        "transcript": " ".join(rng.choices(WORDS, k=int(rng.lognormvariate(6.0, 0.6)))),
+        "sentiment_only": rng.random() < SENTIMENT_ONLY_SHARE,
+    } for _ in range(items)]
+
+def run(variant, inputs, args):
+    stub = StubOllama(args.slots, args.eval_ms_per_token)
+    chat = ChatOllama(model=analyze_transcripts.MODEL_NAME, base_url=stub.url, num_ctx=analyze_transcripts.NUM_CTX,
+                      num_predict=analyze_transcripts.RESPONSE_TOKENS, keep_alive=analyze_transcripts.KEEP_ALIVE)
+    previous = (analyze_transcripts.llm, analyze_transcripts.prompt, analyze_transcripts.sentiment_prompt)
+    analyze_transcripts.llm = chat
+    try:
+        start = time.perf_counter()
+        if variant == "legacy":
+            def classify(item):
+                schema = analyze_transcripts.SENTIMENT_SCHEMA if item["sentiment_only"] else analyze_transcripts.RESPONSE_SCHEMA
+                return analyze_transcripts.stream_json(chat, legacy_messages(item), schema)[0]
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(classify, inputs))
+        else:
+            analyze_transcripts.prompt, analyze_transcripts.sentiment_prompt = analyze_transcripts.PROMPTS[variant]
+            results = analyze_transcripts.classifier.batch(inputs, config={"max_concurrency": args.concurrency})
+        elapsed = time.perf_counter() - start
+    finally:
+        analyze_transcripts.llm, analyze_transcripts.prompt, analyze_transcripts.sentiment_prompt = previous
+        stub.close()
+    assert all(analyze_transcripts.is_valid_result(result, analyze_transcripts.SENTIMENT_SCHEMA) for result in results)
+    return elapsed, stub.requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=analyze_transcripts.MAX_CONCURRENCY)
+    parser.add_argument("--concurrency", type=int, default=analyze_transcripts.MAX_CONCURRENCY)
+    parser.add_argument("--eval-ms-per-token", type=float, default=0.5, help="simulated prompt-eval cost")
+    args = parser.parse_args()
+
+    inputs = workload(args.items)
+    print(f"{args.items} transcripts ({SENTIMENT_ONLY_SHARE:.0%} sentiment-only), {args.slots} slots, "
+          f"{args.concurrency} parallel, {args.eval_ms_per_token} ms per evaluated prompt token\n")
+    print(f"{'variant':<34} {'sent tok/item':>14} {'evaluated tok/item':>19} {'prompt eval ms/item':>20} {'wall s':>8}")
+    for variant, label in [("legacy", "one prompt, transcript in middle"), ("full", "system prefix + message (full)"),
+                           ("lite", "system prefix + message (lite)")]:
+        elapsed, requests = run(variant, inputs, args)
+        sent = sum(tokens for tokens, _, _ in requests) / len(requests)
+        evaluated = sum(tokens for _, tokens, _ in requests) / len(requests)
+        print(f"{label:<34} {sent:>14.0f} {evaluated:>19.0f} {evaluated * args.eval_ms_per_token:>20.1f} {elapsed:>8.2f}")
+    print(f"\nkeep_alive sent with every request: {requests[0][2]!r}")
+
+if __name__ == "__main__":
+    main()
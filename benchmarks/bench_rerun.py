@@ -0,0 +1,101 @@
+"""Dashboard rerun cost: row-wise apply vs. vectorized group/sponsorship columns, plus full headless reruns.
+
+    python -m benchmarks.bench_rerun --sizes 10000 100000 1000000
+
+The full rerun runs the current lego.py and benchmarks/legacy_lego.py, the dashboard before the change.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import dashboard_data
+from benchmarks.synthetic_db import create_synthetic_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGO_PY = os.path.join(ROOT, "lego.py")
+LEGACY_LEGO_PY = os.path.join(ROOT, "benchmarks", "legacy_lego.py")
+
+# ---------- the row-wise versions as they were, kept as the baseline ----------
+def assign_group(row):
+    if row['sponsored']: return "Sponsored"
+    elif row['Theme'] == "Ninjago": return "Ninjago"
+    elif row['Theme'] == "Star Wars": return "Star Wars"
+    else: return "Other"
+
+def format_sponsoring(ratio):
+    if ratio == 0 or pd.isna(ratio):
+        return '<span style="color: gray;">not sponsored</span>'
+    else:
+        percent = int(round(ratio * 100))
+        return f'<span style="color: red;"><b>{percent} %</b> sponsored</span>'
+
+def legacy_transforms(df, uploaders):
+    df = df.copy()
+    df['group'] = df.apply(assign_group, axis=1)
+    uploaders['sponsored_bin'] = uploaders['sponsored_ratio'].apply(lambda x: 'sponsored' if x >= 0.1 else 'not sponsored')
+    uploaders['Sponsorship'] = uploaders['sponsored_ratio'].apply(format_sponsoring)
+
+def vectorized_transforms(df, uploaders):
+    # 'group' is precomputed in the cached loader and FilterIndex avoids the frame copy,
+    # only the per-uploader columns remain per rerun
+    uploaders['sponsored_bin'] = np.where(uploaders['sponsored_ratio'] >= 0.1, 'sponsored', 'not sponsored')
+    percent = (uploaders['sponsored_ratio'] * 100).round().astype('Int64').astype(str)
+    uploaders['Sponsorship'] = np.where(
+        uploaders['sponsored_ratio'].fillna(0) == 0,
+        '<span style="color: gray;">not sponsored</span>',
+        '<span style="color: red;"><b>' + percent + ' %</b> sponsored</span>'
+    )
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def full_rerun(workdir, script=LEGO_PY, reruns=3):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    # the caches outlive an AppTest, without this the next size would reuse the frame of the previous one
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        at = AppTest.from_file(script, default_timeout=600)
+        at.run()  # cold start fills the caches
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        start = time.perf_counter()
+        for _ in range(reruns):
+            at.run()
+        return (time.perf_counter() - start) / reruns
+    finally:
+        os.chdir(cwd)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-app", action="store_true", help="only time the transforms, not a headless lego.py rerun")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "data"))
+            db_path = os.path.join(tmp, dashboard_data.DB_PATH)
+            create_synthetic_db(db_path, size, transcript_chars=200)
+            df = dashboard_data.build_snapshot(db_path, os.path.join(tmp, dashboard_data.SNAPSHOT_PATH))
+            uploaders = df.groupby('uploader').agg(sponsored_ratio=('sponsored', 'mean')).reset_index()
+
+            legacy = timed(legacy_transforms, df, uploaders.copy())
+            vectorized = timed(vectorized_transforms, df, uploaders.copy())
+            line = f"{size:>9,} videos  row-wise {legacy:7.3f} s   vectorized {vectorized:7.3f} s"
+            if not args.skip_app:
+                line += f"   full rerun before {full_rerun(tmp, LEGACY_LEGO_PY):7.3f} s, after {full_rerun(tmp):7.3f} s"
+            print(line)
+
+if __name__ == "__main__":
+    main()
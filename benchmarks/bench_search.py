@@ -0,0 +1,62 @@
+"""Transcript search: pandas str.contains over all transcripts vs. the FTS5 index (dashboard search panel).
+
+    python -m benchmarks.bench_search --videos 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import storage
+from benchmarks.synthetic_db import create_synthetic_db
+from dashboard_data import search_reviews
+
+# the synthetic transcripts share a small vocabulary, so their words match nearly every video (worst case);
+# titles ("LEGO review 4242") give a selective query like a real brand or set name would
+QUERIES = ['"review 4242"', '"price piece"', "minifigure", "sticker OR instructions", "LAN"]
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=100_000)
+    parser.add_argument("--transcript-chars", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"⏳ Generating {args.videos:,} synthetic videos with search index...")
+        start = time.perf_counter()
+        create_synthetic_db(db_path, args.videos, transcript_chars=args.transcript_chars, search_index=True)
+        print(f"⏱️ Generated and indexed in {time.perf_counter() - start:.1f} s")
+        conn = storage.connect(db_path)
+
+        # the scan needs every transcript in memory; loading them is reported once, the scans exclude it
+        video_ids = [row[0] for row in conn.execute("SELECT video_id FROM transcripts")]
+        start = time.perf_counter()
+        texts = storage.load_transcripts(conn, video_ids)
+        transcripts = pd.Series([f"{texts[video_id][0]} {texts[video_id][1]}" for video_id in video_ids], index=video_ids)
+        print(f"⏱️ Loading all transcripts for str.contains: {time.perf_counter() - start:.1f} s, "
+              f"{transcripts.str.len().sum() / 2**20:.0f} MiB of text")
+        del texts
+        # sidebar selection of about a third of the videos
+        selection = set(video_ids[::3])
+
+        for query in QUERIES:
+            needle = query.strip('"').split(" OR ")[0].replace("review ", "")
+            scan_ms, matches = timed(lambda: transcripts[transcripts.str.contains(needle, case=False, regex=False)], 1)
+            fts_ms, hits = timed(lambda: storage.search_transcripts(conn, query), args.repeat)
+            panel_ms, _ = timed(lambda: search_reviews(conn, query, selection), args.repeat)
+            print(f"{query:<26} str.contains {scan_ms:8.1f} ms ({len(matches):,})   "
+                  f"FTS5 all hits {fts_ms:7.1f} ms ({len(hits):,})   filtered top 20 + snippets {panel_ms:6.1f} ms")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
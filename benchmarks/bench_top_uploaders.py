@@ -0,0 +1,95 @@
+"""Top Fans / Critics section: per-uploader scans + HTML for everyone vs. one grouped pass + HTML for the top N.
+
+    python -m benchmarks.bench_top_uploaders --uploaders 50000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dashboard_data import GROUP_ORDER, build_cube, review_details, score_map, summarize_uploaders
+
+CATEGORIES = list(score_map)
+
+def synthetic_reviews(uploaders, reviews_per_uploader=4, sets=2000, seed=42):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 2 * reviews_per_uploader, uploaders)
+    size = int(counts.sum())
+    set_ids = rng.integers(0, sets, size)
+    categories = rng.choice(CATEGORIES, size)
+    # Monday of the upload week, the label derived from it as in prepare_frame
+    week_start = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 52, size) * 7, unit='D')
+    return pd.DataFrame({
+        'video_id': [f"vid{i}" for i in range(size)],
+        'uploader': np.repeat([f"uploader_{i}" for i in range(uploaders)], counts),
+        'lego_number': set_ids.astype(str),
+        'SetName': [f"Set {i}" for i in set_ids],
+        'Theme': rng.choice(["Star Wars", "Ninjago", "City"], size),
+        'release_year': rng.choice([2024, 2025], size),
+        'upload_week_start': week_start,
+        'upload_week_label': week_start.strftime('%Y-W%U'),
+        'sponsored': rng.random(size) < 0.15,
+        'views': pd.array(rng.integers(500, 100_000, size), dtype='Int64'),
+        'review_category': categories,
+        'review_score': pd.Series(categories).map(score_map).to_numpy(),
+        'group': pd.Categorical(rng.choice(GROUP_ORDER, size), categories=GROUP_ORDER),
+    })
+
+# ---------- the section as it was, kept as the baseline ----------
+def legacy_section(df, html_sample):
+    reliable_uploaders = df.groupby('uploader').filter(lambda x: len(x) >= 3)
+    review_summaries = df.groupby(['uploader', 'SetName', 'Theme'])['review_category'].apply(list).reset_index()
+
+    def make_expansion_html(uploader):
+        rows = review_summaries[review_summaries['uploader'] == uploader]
+        items = []
+        for _, row in rows.iterrows():
+            for cat in row['review_category']:
+                items.append(f"<li>{row['Theme']} <b>{row['SetName']}</b>: {cat}</li>")
+        return "<ul style='margin:0; padding-left:16px'>" + "\n".join(items) + "</ul>"
+
+    uploader_scores = reliable_uploaders.groupby('uploader').agg(
+        avg_score=('review_score', 'mean'),
+        video_count=('video_id', 'count'),
+        total_views=('views', 'sum'),
+        sponsored_ratio=('sponsored', 'mean')
+    ).dropna().reset_index()
+    # the original builds HTML for every uploader; time a sample and extrapolate
+    start = time.perf_counter()
+    uploader_scores['uploader'].head(html_sample).apply(make_expansion_html)
+    per_uploader = (time.perf_counter() - start) / min(html_sample, len(uploader_scores))
+    return per_uploader * len(uploader_scores)
+
+def current_section(df, top_n=10):
+    uploader_scores = summarize_uploaders(build_cube(df))
+    top_fans = uploader_scores.sort_values(by=['avg_score', 'total_views'], ascending=[False, False]).head(top_n)
+    top_critics = uploader_scores.sort_values(by=['avg_score', 'total_views'], ascending=[True, False]).head(top_n)
+    details = review_details(df, pd.concat([top_fans['uploader'], top_critics['uploader']]).unique())
+    return [
+        "<ul style='margin:0; padding-left:16px'>" + "\n".join(
+            f"<li>{theme} <b>{set_name}</b>: {category}</li>" for theme, set_name, category in items
+        ) + "</ul>"
+        for items in details.values()
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploaders", type=int, default=50_000)
+    parser.add_argument("--html-sample", type=int, default=200, help="uploaders timed for the extrapolated baseline")
+    args = parser.parse_args()
+
+    df = synthetic_reviews(args.uploaders)
+    print(f"{args.uploaders:,} uploaders, {len(df):,} reviews")
+
+    start = time.perf_counter()
+    html_estimate = legacy_section(df, args.html_sample)
+    legacy = time.perf_counter() - start + html_estimate
+    print(f"legacy (HTML extrapolated) {legacy:9.2f} s")
+
+    start = time.perf_counter()
+    current_section(df)
+    print(f"grouped pass + top-N HTML  {time.perf_counter() - start:9.2f} s")
+
+if __name__ == "__main__":
+    main()
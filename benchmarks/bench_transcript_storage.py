@@ -0,0 +1,59 @@
+"""Transcripts inline in video_details vs. the compressed transcripts side table: file size and metadata scans.
+
+    python -m benchmarks.bench_transcript_storage --videos 100000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import storage
+from benchmarks.synthetic_db import create_synthetic_db
+
+# metadata-only reads that used to pull the text pages along
+QUERIES = {
+    "SELECT * FROM video_details": "SELECT * FROM video_details",
+    "category histogram": "SELECT review_category, COUNT(*), AVG(confidence_score) FROM video_details GROUP BY 1",
+    "analyzer backlog": "SELECT video_id FROM video_details WHERE review_category IS NULL",
+}
+
+def file_size(db_path):
+    return sum(os.path.getsize(path) for path in (db_path, f"{db_path}-wal") if os.path.exists(path))
+
+def report(label, db_path, repeat):
+    conn = sqlite3.connect(db_path)
+    print(f"\n{label}: {file_size(db_path) / 2**20:.1f} MiB")
+    for name, sql in QUERIES.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = len(conn.execute(sql).fetchall())
+        print(f"  {name:<30} {(time.perf_counter() - start) / repeat * 1000:9.1f} ms   {rows:,} rows")
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=100_000)
+    parser.add_argument("--transcript-chars", type=int, default=8000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"⏳ Generating {args.videos:,} synthetic videos with inline transcripts...")
+        create_synthetic_db(db_path, args.videos, transcript_chars=args.transcript_chars, layout="inline")
+        report("inline transcripts", db_path, args.repeat)
+
+        start = time.perf_counter()
+        conn = storage.connect(db_path)
+        print(f"\n⏱️ Migration incl. VACUUM: {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        video_ids = [row[0] for row in conn.execute("SELECT video_id FROM video_details LIMIT 50")]
+        texts = storage.load_transcripts(conn, video_ids)
+        print(f"⏱️ Lazy load of {len(texts)} transcripts: {(time.perf_counter() - start) * 1000:.1f} ms")
+        conn.close()
+        report("transcripts side table (zlib)", db_path, args.repeat)
+
+if __name__ == "__main__":
+    main()
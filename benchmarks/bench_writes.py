@@ -0,0 +1,70 @@
+"""Analyzer writes: one commit per UPDATE (rollback journal and WAL) vs. storage.BatchedWriter.
+
+    python -m benchmarks.bench_writes --rows 20000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import storage
+from benchmarks.synthetic_db import CATEGORIES, create_synthetic_db
+
+UPDATE_SQL = """
+    UPDATE video_details
+    SET review_category = ?, review_rationale = ?, confidence_score = ?, sponsored = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE video_id = ?
+"""
+
+def updates(rows, seed=7):
+    rng = random.Random(seed)
+    return [(rng.choice(CATEGORIES), "benchmark", rng.randint(40, 99), int(rng.random() < 0.15), f"vid{i:09d}")
+            for i in range(rows)]
+
+def rollback_journal_connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    return conn
+
+def per_row_commit(conn, params):
+    # the analyzer before the storage module: conn.commit() after every UPDATE
+    for row in params:
+        conn.execute(UPDATE_SQL, row)
+        conn.commit()
+
+def batched(conn, params, batch_size=storage.WRITE_BATCH_SIZE):
+    with storage.BatchedWriter(conn, UPDATE_SQL, batch_size) as writer:
+        for row in params:
+            writer.add(row)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=storage.WRITE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    params = updates(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"⏳ Generating {args.rows:,} synthetic videos...")
+        create_synthetic_db(db_path, args.rows, transcript_chars=200)
+        storage.connect(db_path).close()  # schema and indexes, so every variant updates by index
+
+        variants = [
+            ("per-row commit, rollback journal", rollback_journal_connect, per_row_commit),
+            ("per-row commit, WAL", storage.connect, per_row_commit),
+            (f"BatchedWriter ({args.batch_size}), WAL", storage.connect,
+             lambda conn, rows: batched(conn, rows, args.batch_size)),
+        ]
+        for name, connect, write in variants:
+            conn = connect(db_path)
+            start = time.perf_counter()
+            write(conn, params)
+            elapsed = time.perf_counter() - start
+            conn.close()
+            print(f"{name:<36} {elapsed:8.2f} s   {len(params) / elapsed:12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Pipeline runner with stub stages: overlapping stages, retries with backoff up to max_attempts, resume after a crash.
+
+    python -m benchmarks.check_pipeline
+
+Every scenario runs on its own temporary database with fast backoff settings; a failed check raises an AssertionError.
+"""
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import pipeline
+import storage
+
+FAST = {"backoff_base": 0.05, "backoff_max": 1.0, "poll_interval": 0.01, "max_retry_wait": 5.0}
+
+@contextlib.contextmanager
+def fresh_db():
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        yield os.path.join(tmp, "pipeline.db")
+
+def seed(db_path, stage, items):
+    conn = storage.connect(db_path)
+    with conn:
+        pipeline.enqueue(conn, stage, items)
+    conn.close()
+
+def jobs(db_path):
+    """{(stage, item): (status, attempts)}"""
+    conn = storage.connect(db_path)
+    rows = {(stage, item): (status, attempts)
+            for stage, item, status, attempts in conn.execute("SELECT stage, item, status, attempts FROM jobs")}
+    conn.close()
+    return rows
+
+class Recorder:
+    """Thread-safe log of (stage, item, time) per handler call."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, items):
+        with self._lock:
+            self.calls.extend((stage, item, time.monotonic()) for item in items)
+
+    def times(self, stage, item=None):
+        return [at for name, called, at in self.calls if name == stage and item in (None, called)]
+
+# ---------- Scenarios ----------
+def check_overlapping_stages():
+    recorder = Recorder()
+
+    def produce(conn, items):
+        recorder.add("a", items)
+        time.sleep(0.02)  # slow enough that stage b starts on the first follow-ups before a is through
+        return {item: [f"{item}-x", f"{item}-y"] for item in items}
+
+    def consume(conn, items):
+        recorder.add("b", items)
+        return {item: [] for item in items}
+
+    with fresh_db() as db_path:
+        seed(db_path, "a", [f"item{i}" for i in range(20)])
+        pipeline.Pipeline([pipeline.Stage("a", produce, workers=2), pipeline.Stage("b", consume, workers=2, batch_size=5)],
+                          db_path, **FAST).run()
+        rows = jobs(db_path)
+    assert len(rows) == 60 and all(status == "done" for status, _ in rows.values()), rows
+    assert len(recorder.times("b")) == 40, "every follow-up is handled exactly once"
+    assert min(recorder.times("b")) < max(recorder.times("a")), "stage b starts while stage a still runs"
+
+def check_retry_backoff():
+    recorder = Recorder()
+
+    def flaky(conn, items):
+        recorder.add("fetch", items)
+        results = {}
+        for item in items:
+            if item == "broken" or (item == "flaky" and len(recorder.times("fetch", item)) < 3):
+                results[item] = RuntimeError("stub failure")
+            elif item != "silent":  # no result at all counts as failed as well
+                results[item] = []
+        return results
+
+    with fresh_db() as db_path:
+        seed(db_path, "fetch", ["ok", "flaky", "broken", "silent"])
+        pipeline.Pipeline([pipeline.Stage("fetch", flaky)], db_path, max_attempts=4, **FAST).run()
+        rows = jobs(db_path)
+    assert rows[("fetch", "ok")] == ("done", 1), rows
+    assert rows[("fetch", "flaky")] == ("done", 3), rows
+    assert rows[("fetch", "broken")] == ("failed", 4), rows
+    assert rows[("fetch", "silent")] == ("failed", 4), rows
+    calls = recorder.times("fetch", "broken")
+    gaps = [later - earlier for earlier, later in zip(calls, calls[1:])]
+    assert len(calls) == 4, "no attempt after max_attempts"
+    # backoff_base * 1, 2, 4 between the attempts
+    assert all(gap >= FAST["backoff_base"] * 2 ** number * 0.9 for number, gap in enumerate(gaps)), gaps
+
+def check_resume_after_crash():
+    recorder = Recorder()
+
+    def handle(conn, items):
+        recorder.add("fetch", items)
+        return {item: [] for item in items}
+
+    with fresh_db() as db_path:
+        seed(db_path, "fetch", ["finished", "interrupted", "waiting"])
+        # state of a run killed while "interrupted" was being handled
+        conn = storage.connect(db_path)
+        with conn:
+            conn.execute("UPDATE jobs SET status = 'done', attempts = 1 WHERE item = 'finished'")
+            conn.execute("UPDATE jobs SET status = 'running', attempts = 1 WHERE item = 'interrupted'")
+        conn.close()
+        pipeline.Pipeline([pipeline.Stage("fetch", handle)], db_path, **FAST).run()
+        rows = jobs(db_path)
+    assert sorted(item for _, item, _ in recorder.calls) == ["interrupted", "waiting"], recorder.calls
+    assert rows[("fetch", "interrupted")] == ("done", 2), rows
+    assert rows[("fetch", "finished")] == ("done", 1), rows
+
+def check_handler_exception():
+    def crash(conn, items):
+        raise ValueError("stub crash")
+
+    with fresh_db() as db_path:
+        seed(db_path, "fetch", ["a", "b"])
+        pipeline.Pipeline([pipeline.Stage("fetch", crash, batch_size=2)], db_path, max_attempts=2, **FAST).run()
+        rows = jobs(db_path)
+    assert rows == {("fetch", "a"): ("failed", 2), ("fetch", "b"): ("failed", 2)}, rows
+
+CHECKS = [check_overlapping_stages, check_retry_backoff, check_resume_after_crash, check_handler_exception]
+
+def main():
+    for check in CHECKS:
+        start = time.perf_counter()
+        check()
+        print(f"✅ {check.__name__} ({time.perf_counter() - start:.2f} s)")
+
+if __name__ == "__main__":
+    main()
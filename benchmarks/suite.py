@@ -0,0 +1,277 @@
+"""Benchmark suite: end-to-end cases on one synthetic database, results stored as JSON and compared with an earlier run.
+
+    python -m benchmarks.suite --videos 100000
+    python -m benchmarks.suite --videos 1000000 --cases loader app --repeat 3
+    python -m benchmarks.suite --baseline benchmarks/results/20250101-120000-abc1234.json
+
+Every case works on its own copy of the generated database. Results go to benchmarks/results/; without
+--baseline the newest earlier result with the same generator settings is compared. Metrics more than
+--threshold slower than the baseline are reported as regressions (exit code 1).
+"""
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import storage
+from benchmarks.synthetic_db import WORDS, create_synthetic_db, write_legosets_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+REGRESSION_THRESHOLD = 0.10
+NOISE_FLOOR = 0.005  # seconds; smaller differences are never a regression
+CATEGORIES = ["strongly negative", "slightly negative", "slightly positive", "strongly positive"]
+
+CASES = {}
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+@contextlib.contextmanager
+def quiet():
+    # the scripts print a line per video, which would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def copy_db(base_path, workdir):
+    db_path = os.path.join(workdir, storage.DB_PATH)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    shutil.copy(base_path, db_path)
+    return db_path
+
+# ---------- Cases: each returns {metric: seconds} ----------
+@case("csv_ingest")
+def csv_ingest(base_path, workdir, args):
+    import yt_extract
+
+    csv_path = os.path.join(workdir, "sets.csv")
+    write_legosets_csv(csv_path, args.csv_sets, args.seed)
+    with quiet():
+        conn = storage.connect(os.path.join(workdir, "ingest.db"))
+        first = timed(yt_extract.load_legosets_from_csv, conn, csv_path)
+        again = timed(yt_extract.load_legosets_from_csv, conn, csv_path)  # nothing changed
+    conn.close()
+    return {"first_import_s": first, "unchanged_reimport_s": again}
+
+def search_entries(rng, count, offset):
+    return [{
+        "id": f"new{offset + i:09d}", "title": f"LEGO review new {i}", "uploader": f"uploader_{rng.randrange(1000)}",
+        "upload_date": "20250101", "view_count": rng.randint(500, 500_000), "duration": rng.randint(60, 3600),
+        "automatic_captions": {"en": []},
+    } for i in range(count)]
+
+def caption_segments(rng, events=300):
+    return [(i * 2500, " ".join(rng.choices(WORDS, k=6))) for i in range(events)]
+
+@case("extractor")
+def extractor(base_path, workdir, args):
+    import yt_extract
+
+    rng = random.Random(args.seed)
+    conn = storage.connect(copy_db(base_path, workdir))
+    with quiet():
+        load_ids = timed(yt_extract.load_known_ids, conn)
+        # one store per search result page, as search_sets_concurrently does
+        pages = [search_entries(rng, 50, page * 50) for page in range(args.extract_videos // 50)]
+        store = timed(lambda: [yt_extract.store_search_results(conn, page, "10000") for page in pages])
+        rows = [(entry["id"], "synthetic description", None, caption_segments(rng)) for page in pages for entry in page]
+
+        def write_transcripts():
+            with storage.BatchedWriter(conn, storage.insert_transcripts, yt_extract.WRITE_BATCH_SIZE) as writer:
+                for row in rows:
+                    writer.add(row)
+        insert = timed(write_transcripts)
+    conn.close()
+    return {"load_known_ids_s": load_ids, "store_search_results_s": store, "insert_transcripts_s": insert}
+
+def fake_llm(latency):
+    from langchain_core.runnables import RunnableLambda
+
+    # answers like the model would, derived from the transcript so reruns are identical
+    def classify(inputs):
+        if latency:
+            time.sleep(latency)
+        digest = hashlib.sha256(inputs["transcript"].encode("utf-8")).digest()
+        return json.dumps({
+            "review_category": CATEGORIES[digest[0] % 4],
+            "review_rationale": "fake llm",
+            "confidence_score": 40 + digest[1] % 60,
+            **({} if inputs.get("sentiment_only") else {"sponsored": digest[2] % 7 == 0}),
+        })
+    return RunnableLambda(classify)
+
+@case("analyzer")
+def analyzer(base_path, workdir, args):
+    import analyze_transcripts
+
+    conn = storage.connect(copy_db(base_path, workdir))
+    runnable = fake_llm(args.llm_latency)
+    with quiet():
+        backlog = timed(analyze_transcripts.analyze_backlog, conn, runnable)
+        # the same backlog again, now answered from the classification cache
+        with conn:
+            conn.execute("UPDATE video_details SET review_category = NULL WHERE review_rationale = 'fake llm'")
+        cached = timed(analyze_transcripts.analyze_backlog, conn, runnable)
+    conn.close()
+    return {"backlog_s": backlog, "cached_backlog_s": cached}
+
+@case("loader")
+def loader(base_path, workdir, args):
+    import dashboard_data
+
+    db_path = copy_db(base_path, workdir)
+    snapshot_path = os.path.join(workdir, dashboard_data.SNAPSHOT_PATH)
+    with quiet():
+        prepare = timed(dashboard_data.prepare_data, db_path)
+        snapshot = timed(dashboard_data.build_snapshot, db_path, snapshot_path)
+        start = time.perf_counter()
+        store = dashboard_data.DashboardStore(db_path, snapshot_path)
+        store_start = time.perf_counter() - start
+        conn = storage.connect(db_path)
+        with conn:
+            conn.execute("""
+                UPDATE video_details SET review_category = 'strongly positive', updated_at = CURRENT_TIMESTAMP
+                WHERE rowid IN (SELECT rowid FROM video_details ORDER BY rowid DESC LIMIT 1000)
+            """)
+        conn.close()
+        refresh = timed(store.refresh)
+    return {"prepare_data_s": prepare, "build_snapshot_s": snapshot, "store_from_snapshot_s": store_start,
+            "refresh_1000_changes_s": refresh}
+
+@case("app")
+def app(base_path, workdir, args):
+    from streamlit.testing.v1 import AppTest
+
+    copy_db(base_path, workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)  # lego.py reads data/ relative to the working directory
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, "lego.py"), default_timeout=600)
+        cold = timed(at.run)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        rerun = min(timed(at.run) for _ in range(3))
+        at.sidebar.multiselect[1].select(at.sidebar.multiselect[1].options[0])
+        filter_change = timed(at.run)
+    finally:
+        os.chdir(cwd)
+    return {"cold_start_s": cold, "rerun_s": rerun, "filter_change_s": filter_change}
+
+# ---------- Results ----------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def find_baseline(config, exclude=None):
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), reverse=True):
+        if path == exclude:
+            continue
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+        if result["config"] == config:
+            return path
+    return None
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for metric, value in results.items():
+        before = baseline.get(metric)
+        if before is None:
+            print(f"{metric:<40} {'-':>10} {value:>10.3f}")
+            continue
+        change = (value - before) / before if before else 0.0
+        regressed = change > threshold and value - before > NOISE_FLOOR
+        if regressed:
+            regressions.append(metric)
+        print(f"{metric:<40} {before:>10.3f} {value:>10.3f} {change:>+7.0%} {'⚠️' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=100_000, help="1k to 10M")
+    parser.add_argument("--transcript-chars", type=int, default=2000)
+    parser.add_argument("--uploader-skew", type=float, default=1.2)
+    parser.add_argument("--theme-skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the median is stored")
+    parser.add_argument("--csv-sets", type=int, default=20_000, help="sets in the CSV ingest case")
+    parser.add_argument("--extract-videos", type=int, default=5_000, help="new videos in the extractor case")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--baseline", help="result file to compare with (default: newest with the same settings)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    config = {"videos": args.videos, "transcript_chars": args.transcript_chars, "uploader_skew": args.uploader_skew,
+              "theme_skew": args.theme_skew, "seed": args.seed, "csv_sets": args.csv_sets,
+              "extract_videos": args.extract_videos, "llm_latency": args.llm_latency}
+    samples = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "base.db")
+        print(f"⏳ Generating {args.videos:,} synthetic videos...")
+        with quiet():
+            generation = timed(create_synthetic_db, base_path, args.videos, transcript_chars=args.transcript_chars,
+                               seed=args.seed, uploader_skew=args.uploader_skew, theme_skew=args.theme_skew,
+                               unique_transcripts=True)
+        print(f"⏱️ Generated in {generation:.1f} s")
+
+        for name in args.cases:
+            for run in range(args.repeat):
+                workdir = os.path.join(tmp, f"{name}-{run}")
+                os.makedirs(workdir)
+                for metric, seconds in CASES[name](base_path, workdir, args).items():
+                    samples.setdefault(f"{name}.{metric}", []).append(seconds)
+                shutil.rmtree(workdir)
+            print(f"✅ {name}: " + ", ".join(f"{metric.split('.', 1)[1]} {statistics.median(values):.3f}"
+                                            for metric, values in samples.items() if metric.startswith(f"{name}.")))
+
+    results = {metric: statistics.median(values) for metric, values in samples.items()}
+    created = datetime.now()
+    commit = git_commit()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{created:%Y%m%d-%H%M%S}-{commit or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": created.isoformat(timespec="seconds"), "commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "config": config, "results": results, "samples": samples,
+        }, f, indent=2)
+    print(f"💾 Results written to {path}")
+
+    baseline_path = args.baseline or find_baseline(config, exclude=path)
+    if not baseline_path:
+        print("ℹ️ No earlier run with the same settings to compare with.")
+        return
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"📊 Compared with {os.path.basename(baseline_path)} (commit {baseline['commit']})")
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} metrics regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Synthetic LEGO review database for benchmarks (same tables and columns as the real pipeline)."""
+import argparse
+import csv
+import itertools
+import math
+import random
+import sqlite3
+
+import storage
+
+THEMES = ["Star Wars", "Ninjago", "City", "Technic", "Icons", "Friends", "Marvel", "Harry Potter"]
+THEME_WEIGHTS = [30, 20, 15, 10, 8, 7, 6, 4]
+CATEGORIES = ["strongly negative", "slightly negative", "slightly positive", "strongly positive"]
+CSV_COLUMNS = ["Number", "SetName", "Theme", "Subtheme", "Year", "Pieces", "Minifigs", "USRetailPrice",
+               "PackagingType", "LaunchDate"]  # a Brickset export, reduced
+CHUNK_SIZE = 100_000  # rows generated and inserted at a time, keeps 10M-video databases out of memory
+WORDS = ("the set build minifigure brick price piece really nice color sticker instructions model "
+         "display play feature detail design lego review think pretty good bad little big").split()
+
+# schema before storage.py: transcripts and descriptions inline in video_details (layout="inline")
+SCHEMA = [
+    "CREATE TABLE legosets (Number TEXT, SetName TEXT, Theme TEXT, PackagingType TEXT, LaunchDate TEXT)",
+    """CREATE TABLE videos (video_id TEXT, title TEXT, uploader TEXT, upload_date TEXT, views INTEGER,
+       duration INTEGER, transcript TEXT, languages TEXT, lego_number TEXT)""",
+    """CREATE TABLE video_details (video_id TEXT, description TEXT, transcript TEXT, review_category TEXT,
+       review_rationale TEXT, confidence_score INTEGER, sponsored BOOLEAN, transcript_word_count INTEGER,
+       transcript_char_length INTEGER, sponsor_rule TEXT)""",
+]
+
+def _text(rng, chars):
+    words = []
+    size = 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+def transcript_length(rng, transcript_chars, sigma=0.6):
+    # log-normal around transcript_chars: many short reviews, a long tail of 20+ minute videos
+    return max(50, int(rng.lognormvariate(math.log(transcript_chars), sigma)))
+
+def legoset_rows(rng, sets, theme_skew=1.0):
+    weights = [weight ** theme_skew for weight in THEME_WEIGHTS]
+    for n in range(sets):
+        year = rng.choice([2023, 2024, 2025])
+        yield (str(10000 + n), f"Set {n}", rng.choices(THEMES, weights)[0], "Box" if rng.random() < 0.9 else "Polybag",
+               f"{year}-{rng.randint(1, 12):02}-01")
+
+def write_legosets_csv(path, sets=1000, seed=42, theme_skew=1.0):
+    """Brickset-style CSV with `sets` sets (the Number of set n matches the database generator)."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for number, name, theme, packaging, launch_date in legoset_rows(rng, sets, theme_skew):
+            pieces = int(rng.lognormvariate(math.log(400), 0.9))
+            writer.writerow([number, name, theme, f"{theme} {rng.randint(1, 5)}", launch_date[:4], pieces,
+                             rng.randint(0, 8), f"{pieces * 0.1:.2f}", packaging, launch_date])
+
+def create_synthetic_db(path, videos=100_000, sets=None, uploaders=None, transcript_chars=2000, seed=42, layout="current",
+                        search_index=False, uploader_skew=1.2, theme_skew=1.0, classified_share=0.9,
+                        unique_transcripts=False):
+    """Write a database with `videos` videos; sets and uploaders default to a realistic ratio.
+
+    Uploaders follow a Pareto distribution with shape `uploader_skew` (smaller = a few channels post even more
+    of the reviews); theme_skew sharpens (>1) or flattens (<1) the theme weights.
+    Transcript lengths are log-normal around transcript_chars and drawn from a pool of pre-built texts to keep
+    generation fast; unique_transcripts=True appends the video ID so every transcript hash differs (no
+    analyzer cache hits between videos, slower to generate).
+    layout="current" writes the schema of storage.py, "inline" the old one that storage.connect migrates.
+    search_index=True also fills the FTS5 index (slow for large databases, only the search benchmark needs it).
+    """
+    rng = random.Random(seed)
+    sets = sets or max(videos // 20, 10)
+    uploaders = uploaders or max(videos // 10, 10)
+    if layout == "inline":
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=OFF")
+        for statement in SCHEMA:
+            conn.execute(statement)
+    else:
+        conn = storage.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+
+    conn.executemany("INSERT INTO legosets VALUES (?, ?, ?, ?, ?)", legoset_rows(rng, sets, theme_skew))
+
+    transcripts = [_text(rng, transcript_length(rng, transcript_chars)) for _ in range(200)]
+    descriptions = [_text(rng, 300) for _ in range(50)]
+
+    def video_rows():
+        for i in range(videos):
+            uploader = min(int(rng.paretovariate(uploader_skew)), uploaders) - 1
+            yield (f"vid{i:09d}", f"LEGO review {i}", f"uploader_{uploader}",
+                   f"{rng.choice([2023, 2024, 2025])}{rng.randint(1, 12):02}{rng.randint(1, 28):02}",
+                   rng.randint(500, 500_000), rng.randint(60, 3600), "Ja", "en", str(10000 + rng.randrange(sets)))
+
+    # (index into the pool, description index, classification columns) per video
+    def details():
+        for i in range(videos):
+            classified = rng.random() < classified_share
+            yield (f"vid{i:09d}", rng.randrange(len(transcripts)), rng.randrange(len(descriptions)),
+                   rng.choice(CATEGORIES) if classified else None, "synthetic" if classified else None,
+                   rng.randint(40, 99) if classified else None, int(rng.random() < 0.15) if classified else None)
+
+    conn.executemany("INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", video_rows())
+    def transcript(video_id, t):
+        return f"{transcripts[t]} {video_id}" if unique_transcripts else transcripts[t]
+
+    if layout == "inline":
+        conn.executemany("INSERT INTO video_details VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            (video_id, descriptions[d], transcript(video_id, t), *classification,
+             len(transcript(video_id, t).split()), len(transcript(video_id, t)), None)
+            for video_id, t, d, *classification in details()
+        ))
+    else:
+        stats = [storage.transcript_stats(text) for text in transcripts]
+        blobs = [storage.compress_text(text) for text in transcripts]
+        description_blobs = [storage.compress_text(text) for text in descriptions]
+        rows = details()
+        while chunk := list(itertools.islice(rows, CHUNK_SIZE)):
+            if unique_transcripts:
+                texts = [transcript(video_id, t) for video_id, t, *_ in chunk]
+                chunk_stats = [storage.transcript_stats(text) for text in texts]
+                chunk_blobs = [storage.compress_text(text) for text in texts]
+            else:
+                chunk_stats = [stats[t] for _, t, *_ in chunk]
+                chunk_blobs = [blobs[t] for _, t, *_ in chunk]
+            conn.executemany("""
+                INSERT INTO video_details (video_id, review_category, review_rationale, confidence_score, sponsored,
+                                           transcript_hash, transcript_word_count, transcript_char_length)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, ((video_id, *classification, *row_stats)
+                  for (video_id, _, _, *classification), row_stats in zip(chunk, chunk_stats)))
+            conn.executemany("INSERT INTO transcripts (video_id, description, transcript) VALUES (?, ?, ?)",
+                             ((video_id, description_blobs[d], blob) for (video_id, _, d, *_), blob in zip(chunk, chunk_blobs)))
+        if search_index:
+            storage.index_all_transcripts(conn, chunk_size=10_000)
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--videos", type=int, default=100_000, help="1k to 10M")
+    parser.add_argument("--sets", type=int)
+    parser.add_argument("--uploaders", type=int)
+    parser.add_argument("--transcript-chars", type=int, default=2000, help="median transcript length")
+    parser.add_argument("--uploader-skew", type=float, default=1.2, help="Pareto shape, smaller = more skewed")
+    parser.add_argument("--theme-skew", type=float, default=1.0, help="exponent on the theme weights")
+    parser.add_argument("--classified-share", type=float, default=0.9)
+    parser.add_argument("--unique-transcripts", action="store_true")
+    parser.add_argument("--search-index", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--layout", choices=["current", "inline"], default="current")
+    args = parser.parse_args()
+    create_synthetic_db(args.path, args.videos, args.sets, args.uploaders, args.transcript_chars, args.seed, args.layout,
+                        args.search_index, args.uploader_skew, args.theme_skew, args.classified_share,
+                        args.unique_transcripts)
+    print(f"✅ {args.videos} synthetic videos written to {args.path}")
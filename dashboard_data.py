@@ -0,0 +1,370 @@
+import html
+import os
+import re
+import threading
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import storage
+
+DB_PATH = storage.DB_PATH
+SNAPSHOT_VERSION = 2  # bump when the prepared columns change, old snapshots are then ignored
+SNAPSHOT_PATH = f"data/lego_reviews.v{SNAPSHOT_VERSION}.parquet"
+
+# Join, projection and the cheap predicates run in SQLite (indexes in storage.py); only the charted columns are read
+DASHBOARD_QUERY = """
+    SELECT v.video_id, v.uploader, v.upload_date, v.views, v.lego_number,
+           d.review_category, d.sponsored,
+           l.SetName, l.Theme, l.LaunchDate
+    FROM videos v
+    JOIN legosets l ON l.Number = v.lego_number
+    LEFT JOIN video_details d ON d.video_id = v.video_id
+    WHERE LOWER(l.PackagingType) = 'box'
+      AND REPLACE(v.upload_date, '-', '') >= '20230101'
+      AND l.LaunchDate IS NOT NULL AND l.LaunchDate != ''
+"""
+
+# Timeline groups, sponsorship wins over the theme
+GROUP_ORDER = ["Other", "Star Wars", "Ninjago", "Sponsored"]
+
+score_map = {
+    "strongly negative": 1,
+    "slightly negative": 2,
+    "slightly positive": 3,
+    "strongly positive": 4
+}
+
+# ---------- Load & prepare data from SQLite ----------
+def prepare_frame(df):
+    df['upload_date'] = pd.to_datetime(df['upload_date'], errors='coerce')
+    df['LaunchDate'] = pd.to_datetime(df['LaunchDate'], errors='coerce')
+    df['views'] = pd.to_numeric(df['views'], errors='coerce').astype('Int64')
+    df['sponsored'] = df['sponsored'].astype(bool)
+
+    # date formats vary in the source data, so the launch window is checked after parsing
+    filtered = df[
+        (df['upload_date'] >= pd.Timestamp('2023-01-01')) &
+        (df['LaunchDate'].notna()) &
+        ((df['LaunchDate'] - df['upload_date']).dt.days <= 183)
+    ].copy()
+
+    filtered['upload_week_start'] = filtered['upload_date'] - pd.to_timedelta(filtered['upload_date'].dt.weekday, unit='D')
+    filtered['upload_week_label'] = filtered['upload_week_start'].dt.strftime('%Y-W%U')
+    filtered['release_year'] = filtered['LaunchDate'].dt.year
+    filtered['review_score'] = filtered['review_category'].map(score_map)
+    filtered['group'] = pd.Categorical(np.select(
+        [filtered['sponsored'].to_numpy(), filtered['Theme'].isin(["Ninjago"]).to_numpy(), filtered['Theme'].isin(["Star Wars"]).to_numpy()],
+        ["Sponsored", "Ninjago", "Star Wars"],
+        default="Other"
+    ), categories=GROUP_ORDER)
+
+    return filtered.reset_index(drop=True)
+
+def prepare_data(db_path=DB_PATH):
+    conn = storage.connect(db_path)
+    df = pd.read_sql_query(DASHBOARD_QUERY, conn)
+    conn.close()
+    return prepare_frame(df)
+
+# ---------- Parquet snapshot (rebuilt only when the database changed) ----------
+def db_mtime(db_path=DB_PATH):
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"database {db_path} not found, run yt_extract.py first")
+    # with WAL, recent writes only touch the -wal file until the next checkpoint
+    paths = [db_path, f"{db_path}-wal"]
+    return max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+
+def snapshot_is_stale(db_path=DB_PATH, snapshot_path=SNAPSHOT_PATH):
+    # db_mtime first: a missing database is an error, not an empty snapshot
+    mtime = db_mtime(db_path)
+    return not os.path.exists(snapshot_path) or os.path.getmtime(snapshot_path) < mtime
+
+def build_snapshot(db_path=DB_PATH, snapshot_path=SNAPSHOT_PATH):
+    df = prepare_data(db_path)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, snapshot_path)
+    return df
+
+def load_data(db_path=DB_PATH, snapshot_path=SNAPSHOT_PATH):
+    if snapshot_is_stale(db_path, snapshot_path):
+        return build_snapshot(db_path, snapshot_path)
+    return pd.read_parquet(snapshot_path, memory_map=True)
+
+# ---------- Filter index for the sidebar filters ----------
+SPONSORED_FILTERS = {"All": None, "Only Sponsored": True, "Only Non-Sponsored": False}
+
+class FilterIndex:
+    """Sorted row positions per release year, theme and sponsorship, built once per dataset.
+
+    select() intersects the position arrays of the chosen values and returns a `take` of the
+    frame; results are memoized per filter tuple. Returned frames are shared, treat them as read-only.
+    """
+
+    FILTER_COLUMNS = ["release_year", "Theme", "sponsored"]
+
+    def __init__(self, df, cache_size=64):
+        self.df = df
+        self.positions = {column: df.groupby(column, observed=True).indices for column in self.FILTER_COLUMNS}
+        self._select = lru_cache(maxsize=cache_size)(self._select_uncached)
+
+    def options(self, column):
+        return sorted(self.positions[column])
+
+    def _union(self, column, values):
+        arrays = [self.positions[column][value] for value in values if value in self.positions[column]]
+        return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.intp)
+
+    def _select_uncached(self, years, themes, sponsored):
+        positions = None
+        for column, values in (("release_year", years), ("Theme", themes), ("sponsored", sponsored)):
+            if not values:
+                continue
+            matched = self._union(column, values)
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return self.df if positions is None else self.df.take(positions)
+
+    def select(self, years=(), themes=(), sponsored=None):
+        sponsored_values = () if sponsored is None else (sponsored,)
+        return self._select(tuple(sorted(years)), tuple(sorted(themes)), sponsored_values)
+
+# ---------- Aggregate cube for the charts ----------
+# grain of the cube; group and SetName depend on these keys and only ride along
+CUBE_KEYS = ["release_year", "Theme", "sponsored", "upload_week_label", "lego_number", "uploader",
+             "group", "SetName", "upload_week_start"]
+
+TIMELINE_BUCKETS = ["week", "month", "quarter"]
+
+def build_cube(df):
+    """Partial sums per CUBE_KEYS cell; counts, sums and means for every chart roll up from these."""
+    return df.groupby(CUBE_KEYS, observed=True, dropna=False, sort=False).agg(
+        video_count=('video_id', 'count'),
+        view_sum=('views', 'sum'),
+        score_sum=('review_score', 'sum'),
+        score_count=('review_score', 'count')
+    ).reset_index()
+
+def timeline_periods(cube, bucket="week"):
+    if bucket == "week":
+        return cube['upload_week_label']
+    if bucket == "month":
+        return cube['upload_week_start'].dt.strftime('%Y-%m')
+    return cube['upload_week_start'].dt.to_period('Q').astype(str)
+
+def choose_timeline_bucket(cube, max_bars, years=(2024, 2025)):
+    """Finest bucket (week, month, quarter) that keeps the timeline at or below max_bars bars."""
+    timeline = cube[cube['release_year'].isin(years)]
+    for bucket in TIMELINE_BUCKETS:
+        if timeline_periods(timeline, bucket).nunique() <= max_bars:
+            return bucket
+    return TIMELINE_BUCKETS[-1]
+
+def count_timeline(cube, bucket="week", years=(2024, 2025)):
+    timeline = cube[cube['release_year'].isin(years)]
+    periods = timeline_periods(timeline, bucket).rename('period')
+    return timeline.groupby([periods, 'group'], observed=True)['video_count'].sum().reset_index(name='count')
+
+def summarize_sets(cube):
+    sets = cube.assign(sponsored_videos=cube['video_count'].where(cube['sponsored'], 0)).groupby('lego_number').agg(
+        score_sum=('score_sum', 'sum'),
+        score_count=('score_count', 'sum'),
+        review_count=('video_count', 'sum'),
+        total_views=('view_sum', 'sum'),
+        sponsored_videos=('sponsored_videos', 'sum'),
+        SetName=('SetName', 'first'),
+        Theme=('Theme', 'first')
+    )
+    sets['avg_review_score'] = sets['score_sum'] / sets['score_count'].replace(0, np.nan)
+    sets['sponsored_any'] = sets['sponsored_videos'] > 0
+    columns = ['avg_review_score', 'review_count', 'total_views', 'sponsored_any', 'SetName', 'Theme']
+    return sets[columns].dropna().reset_index()
+
+def summarize_uploaders(cube, min_videos=3):
+    uploaders = cube.assign(sponsored_videos=cube['video_count'].where(cube['sponsored'], 0)).groupby('uploader').agg(
+        score_sum=('score_sum', 'sum'),
+        score_count=('score_count', 'sum'),
+        video_count=('video_count', 'sum'),
+        total_views=('view_sum', 'sum'),
+        sponsored_videos=('sponsored_videos', 'sum')
+    )
+    uploaders['avg_score'] = uploaders['score_sum'] / uploaders['score_count'].replace(0, np.nan)
+    uploaders['sponsored_ratio'] = uploaders['sponsored_videos'] / uploaders['video_count']
+    columns = ['avg_score', 'video_count', 'total_views', 'sponsored_ratio']
+    return uploaders.loc[uploaders['video_count'] >= min_videos, columns].dropna().reset_index()
+
+# ---------- Review details for the top fans / critics ----------
+def review_details(df, uploaders):
+    """(Theme, SetName, review_category) per review for the given uploaders, ordered by set, in one grouped pass."""
+    rows = df.loc[df['uploader'].isin(uploaders), ['uploader', 'Theme', 'SetName', 'review_category']]
+    rows = rows.dropna(subset=['uploader', 'SetName', 'Theme']).sort_values(['uploader', 'SetName', 'Theme'], kind='stable')
+    details = {uploader: [] for uploader in uploaders}
+    for uploader, theme, set_name, category in rows.itertuples(index=False):
+        details[uploader].append((theme, set_name, category))
+    return details
+
+# ---------- Transcript search (FTS5 index in storage.py) ----------
+SEARCH_LIMIT = 20
+SEARCH_CANDIDATES = 1000  # best hits checked against the sidebar selection before all hits are ranked
+SNIPPET_CHARS = 240
+FTS_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
+
+def term_pattern(query):
+    """Regex matching the words of an FTS5 query (operators dropped, prefix terms kept as prefixes)."""
+    terms = []
+    for word in re.findall(r'[\w*]+', query):
+        if word in FTS_OPERATORS or not word.strip("*"):
+            continue
+        prefix = word.endswith("*")
+        terms.append(re.escape(word.strip("*")) + (r"\w*" if prefix else r"\b"))
+    return re.compile(r"\b(?:" + "|".join(terms) + ")", re.IGNORECASE) if terms else None
+
+def make_snippet(text, pattern, width=SNIPPET_CHARS):
+    """HTML excerpt of `width` characters around the first match, matches wrapped in <mark>."""
+    text = text or ""
+    match = pattern.search(text) if pattern else None
+    start = max(0, match.start() - width // 3) if match else 0
+    excerpt = text[start:start + width]
+    parts, last = [], 0
+    for hit in (pattern.finditer(excerpt) if pattern else ()):
+        parts += [html.escape(excerpt[last:hit.start()]), f"<mark>{html.escape(hit.group())}</mark>"]
+        last = hit.end()
+    parts.append(html.escape(excerpt[last:]))
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if start + width < len(text) else "")
+
+def first_mention(segments, pattern):
+    """start_ms of the first caption segment that matches, None without segments or match."""
+    for start_ms, text in segments or ():
+        if pattern and pattern.search(text):
+            return start_ms
+    return None
+
+def search_reviews(conn, query, video_ids=None, limit=SEARCH_LIMIT):
+    """Ranked search hits with snippet and timestamp link; only `video_ids` (the sidebar selection) are kept."""
+    if video_ids is None:
+        hits = storage.search_transcripts(conn, query, limit)
+    else:
+        # most selections keep enough of the best candidates; only narrow ones need the full ranking
+        candidates = storage.search_transcripts(conn, query, max(SEARCH_CANDIDATES, limit))
+        hits = [hit for hit in candidates if hit[0] in video_ids]
+        if len(hits) < limit and len(candidates) == max(SEARCH_CANDIDATES, limit):
+            hits = [hit for hit in storage.search_transcripts(conn, query) if hit[0] in video_ids]
+        hits = hits[:limit]
+    ids = [video_id for video_id, _, _ in hits]
+    texts = storage.load_transcripts(conn, ids)
+    segments = storage.load_segments(conn, ids)
+    pattern = term_pattern(query)
+
+    rows = []
+    for video_id, title, rank in hits:
+        description, transcript = texts.get(video_id, (None, None))
+        # the transcript is the usual hit; title or description only when the transcript does not match
+        source = next((text for text in (transcript, description, title) if text and pattern and pattern.search(text)), transcript)
+        start_ms = first_mention(segments.get(video_id), pattern)
+        url = f"https://www.youtube.com/watch?v={video_id}" + (f"&t={start_ms // 1000}s" if start_ms is not None else "")
+        rows.append((video_id, title, rank, make_snippet(source, pattern), start_ms, url))
+    return pd.DataFrame(rows, columns=['video_id', 'title', 'rank', 'snippet', 'start_ms', 'url'])
+
+# ---------- Incremental refresh ----------
+# new videos and detail rows get higher rowids, re-classified rows a newer updated_at;
+# any write to legosets bumps its counter in table_versions and makes refresh() reload everything
+WATERMARK_QUERY = """
+    SELECT (SELECT IFNULL(MAX(rowid), 0) FROM videos),
+           (SELECT IFNULL(MAX(rowid), 0) FROM video_details),
+           (SELECT IFNULL(MAX(updated_at), '') FROM video_details),
+           (SELECT version FROM table_versions WHERE name = 'legosets')
+"""
+
+CHANGED_ROWS_QUERY = DASHBOARD_QUERY + """
+      AND (v.rowid > ? OR d.rowid > ? OR d.updated_at >= ?)
+"""
+
+def read_watermark(conn):
+    return tuple(conn.execute(WATERMARK_QUERY).fetchone())
+
+def merge_cubes(cube, added, removed):
+    """Adds the cells of `added` to the cube and subtracts those of `removed`; emptied cells are dropped."""
+    measures = ['video_count', 'view_sum', 'score_sum', 'score_count']
+    removed = removed.copy()
+    removed[measures] = -removed[measures]
+    merged = pd.concat([cube, added, removed], ignore_index=True)
+    merged = merged.groupby(CUBE_KEYS, observed=True, dropna=False, sort=False)[measures].sum().reset_index()
+    return merged[merged['video_count'] > 0].reset_index(drop=True)
+
+class DashboardStore:
+    """Prepared frame, filter index and cube that follow the database without full reloads.
+
+    refresh() is cheap while nothing changed (one PRAGMA data_version); after a write it reads only the
+    rows past the stored watermark, replaces their old versions in the frame, patches the cube and
+    rewrites the snapshot; a write to legosets reloads the whole frame instead. It returns
+    (version, filter_index, cube_index) as one consistent state.
+    """
+
+    def __init__(self, db_path=DB_PATH, snapshot_path=SNAPSHOT_PATH):
+        self.db_path = db_path
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        db_mtime(db_path)  # raises before connect() would create an empty database
+        self._conn = storage.connect(db_path, check_same_thread=False)
+        # read before loading, so writes that land during the load are picked up by the next refresh
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self.watermark = read_watermark(self._conn)
+        df = load_data(db_path, snapshot_path)
+        self._cube = build_cube(df)
+        self.version = 0
+        self._state = (self.version, FilterIndex(df), FilterIndex(self._cube))
+
+    def search(self, query, video_ids=None, limit=SEARCH_LIMIT):
+        with self._lock:
+            return search_reviews(self._conn, query, video_ids, limit)
+
+    def refresh(self):
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._apply_changes()
+            return self._state
+
+    def _apply_changes(self):
+        # no early return on an unchanged watermark: updated_at has second resolution, so a re-classification
+        # in the same second as the last one leaves it as is; updated_at >= ? still returns that row
+        watermark = read_watermark(self._conn)
+        if watermark[3] != self.watermark[3]:
+            # a set changed its theme, name or launch date: that touches rows of any age, so no patching
+            self.watermark = watermark
+            self._reload()
+            return
+        changed = pd.read_sql_query(CHANGED_ROWS_QUERY, self._conn, params=self.watermark[:3])
+        self.watermark = watermark
+        if changed.empty:
+            return
+
+        df = self._state[1].df
+        # rows can be fetched twice (e.g. same updated_at second), keep the newest
+        changed = changed.drop_duplicates('video_id', keep='last')
+        replaced = df['video_id'].isin(changed['video_id'])
+        added = prepare_frame(changed)
+        df = pd.concat([df[~replaced], added], ignore_index=True)
+
+        self._cube = merge_cubes(self._cube, build_cube(added), build_cube(self._state[1].df[replaced]))
+        self.version += 1
+        self._state = (self.version, FilterIndex(df), FilterIndex(self._cube))
+        self._write_snapshot(df)
+        print(f"🔄 Dashboard data refreshed: {len(added)} new or changed rows, {len(df)} total")
+
+    def _reload(self):
+        df = prepare_frame(pd.read_sql_query(DASHBOARD_QUERY, self._conn))
+        self._cube = build_cube(df)
+        self.version += 1
+        self._state = (self.version, FilterIndex(df), FilterIndex(self._cube))
+        self._write_snapshot(df)
+        print(f"🔄 Dashboard data reloaded after a legosets change: {len(df)} rows")
+
+    def _write_snapshot(self, df):
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.snapshot_path)
+
+if __name__ == "__main__":
+    df = build_snapshot()
+    print(f"✅ Snapshot with {len(df)} rows written to {SNAPSHOT_PATH}")
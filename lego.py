@@ -1,74 +1,52 @@
-import sqlite3
+import html
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
+import perf
+from dashboard_data import (
+    SPONSORED_FILTERS, DashboardStore, choose_timeline_bucket, count_timeline, review_details, summarize_sets,
+    summarize_uploaders
+)
 
 st.set_page_config(page_title="LEGO Review Dashboard", layout="wide", page_icon="🧱")
+# render time per section of this rerun; the perf panel (?perf=1) shows them with the percentiles of all reruns
+stopwatch = perf.Stopwatch("dashboard")
 
 # ---------- Load & prepare data ----------
-@st.cache_data
-def load_and_prepare_data():
-    db_path = "data/lego_reviews.db"
-    conn = sqlite3.connect(db_path)
-    df_videos = pd.read_sql_query("SELECT * FROM videos", conn)
-    df_video_details = pd.read_sql_query("SELECT * FROM video_details", conn)
-    df_legosets = pd.read_sql_query("SELECT * FROM legosets", conn)
-    conn.close()
-
-    df = pd.merge(df_videos, df_video_details, on="video_id", how="left")
-    df = pd.merge(df, df_legosets, left_on="lego_number", right_on="Number", how="left")
-
-    df['upload_date'] = pd.to_datetime(df['upload_date'], errors='coerce')
-    df['LaunchDate'] = pd.to_datetime(df['LaunchDate'], errors='coerce')
-    int_cols = ['confidence_score', 'views', 'transcript_word_count', 'transcript_char_length']
-    for col in int_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
-    df['sponsored'] = df['sponsored'].astype(bool)
-
-    filtered = df[
-        (df['PackagingType'].str.lower() == 'box') &
-        (df['upload_date'] >= pd.Timestamp('2023-01-01')) &
-        (df['LaunchDate'].notna()) &
-        ((df['LaunchDate'] - df['upload_date']).dt.days <= 183)
-    ].copy()
-
-    filtered['upload_week_start'] = filtered['upload_date'] - pd.to_timedelta(filtered['upload_date'].dt.weekday, unit='D')
-    filtered['upload_week_label'] = filtered['upload_week_start'].dt.strftime('%Y-W%U')
-    filtered['release_year'] = filtered['LaunchDate'].dt.year
-
-    score_map = {
-        "strongly negative": 1,
-        "slightly negative": 2,
-        "slightly positive": 3,
-        "strongly positive": 4
-    }
-    filtered['review_score'] = filtered['review_category'].map(score_map)
+# one store per server process; each rerun picks up new rows from the database incrementally
+@st.cache_resource
+def load_store():
+    return DashboardStore()
+
+store = load_store()
+data_version, filter_index, cube_index = store.refresh()
+stopwatch.lap("load")
 
-    return filtered
+def select_cube(years, themes, sponsored_filter):
+    return cube_index.select(years, themes, SPONSORED_FILTERS[sponsored_filter])
 
-df = load_and_prepare_data()
+# chart data rolled up from the cube, memoized per data version and filter selection
+@st.cache_data(max_entries=256)
+def load_uploader_scores(data_version, years, themes, sponsored_filter):
+    return summarize_uploaders(select_cube(years, themes, sponsored_filter))
 
 # ---------- Sidebar filters ----------
 with st.sidebar:
     st.header("🔍 Filters")
-    year_options = sorted(df['release_year'].dropna().unique())
-    theme_options = sorted(df['Theme'].dropna().unique())
+    year_options = filter_index.options('release_year')
+    theme_options = filter_index.options('Theme')
 
     selected_years = st.multiselect("📅 Release Year", year_options)
     selected_themes = st.multiselect("🎭 Theme", theme_options)
-    sponsored_filter = st.radio("🎁 Sponsorship", ["All", "Only Sponsored", "Only Non-Sponsored"], index=0)
+    sponsored_filter = st.radio("🎁 Sponsorship", list(SPONSORED_FILTERS), index=0)
 
 # ---------- Apply filters ----------
-filtered_df = df.copy()
-if selected_years:
-    filtered_df = filtered_df[filtered_df['release_year'].isin(selected_years)]
-if selected_themes:
-    filtered_df = filtered_df[filtered_df['Theme'].isin(selected_themes)]
-if sponsored_filter == "Only Sponsored":
-    filtered_df = filtered_df[filtered_df['sponsored'] == True]
-elif sponsored_filter == "Only Non-Sponsored":
-    filtered_df = filtered_df[filtered_df['sponsored'] == False]
+filtered_df = filter_index.select(selected_years, selected_themes, SPONSORED_FILTERS[sponsored_filter])
+uploader_scores = load_uploader_scores(data_version, selected_years, selected_themes, sponsored_filter)
+stopwatch.lap("filters")
 
 # ---------- Header ----------
 st.title("🧱 LEGO Review Dashboard")
@@ -97,20 +75,52 @@ with col4:
     st.metric("👁️ Total Views", f"{filtered_df['views'].sum():,}")
 
 st.markdown("---")
-st.subheader("📆 Timeline of Reviews (on Theme Level)")
+stopwatch.lap("kpis")
+
+# ---------- Transcript search ----------
+@st.cache_data(max_entries=64)
+def load_search_results(data_version, query, years, themes, sponsored_filter):
+    selection = filter_index.select(years, themes, SPONSORED_FILTERS[sponsored_filter])
+    results = store.search(query, set(selection['video_id']))
+    return results.merge(selection[['video_id', 'uploader', 'SetName', 'Theme']].drop_duplicates('video_id'), on='video_id', how='left')
+
+def format_timestamp(start_ms):
+    minutes, seconds = divmod(int(start_ms) // 1000, 60)
+    return f"{minutes // 60}:{minutes % 60:02}:{seconds:02}" if minutes >= 60 else f"{minutes}:{seconds:02}"
+
+st.subheader("🔎 Transcript Search")
+search_query = st.text_input(
+    "Search transcripts, titles and descriptions",
+    placeholder='e.g. "price per piece" OR LAN',
+    help='Phrases in quotes, OR / NOT, prefix search with * (e.g. minifig*). Results follow the sidebar filters.'
+).strip()
+
+if search_query:
+    search_results = load_search_results(data_version, search_query, selected_years, selected_themes, sponsored_filter)
+    if search_results.empty:
+        st.info("No reviews match this search for the selected filters.")
+    else:
+        st.caption(f"Top {len(search_results)} matches, best first")
+        for row in search_results.itertuples(index=False):
+            timestamp = f" · <a href='{row.url}' target='_blank'>▶ {format_timestamp(row.start_ms)}</a>" if pd.notna(row.start_ms) else ""
+            st.markdown(f"""
+            <div style='margin-bottom:0.9em;'>
+                <a href='{row.url}' target='_blank'><b>{html.escape(row.title or row.video_id)}</b></a>
+                <span style='color:#aaa;'> · {html.escape(str(row.uploader))} · {html.escape(str(row.SetName))} ({html.escape(str(row.Theme))})</span>{timestamp}
+                <div style='font-size:0.9em; margin-top:0.2em;'>{row.snippet}</div>
+            </div>
+            """, unsafe_allow_html=True)
+stopwatch.lap("search")
 
-# ---------- Timeline Chart ----------
-def assign_group(row):
-    if row['sponsored']: return "Sponsored"
-    elif row['Theme'] == "Ninjago": return "Ninjago"
-    elif row['Theme'] == "Star Wars": return "Star Wars"
-    else: return "Other"
+st.markdown("---")
+st.subheader("📆 Timeline of Reviews (on Theme Level)")
 
-filtered_df['group'] = filtered_df.apply(assign_group, axis=1)
-timeline_data = filtered_df[filtered_df['release_year'].isin([2024, 2025])]
-week_order = sorted(timeline_data['upload_week_label'].unique())
-df_grouped = timeline_data.groupby(['upload_week_label', 'group']).size().reset_index(name='count')
+# ---------- Large-data rendering ----------
+MAX_TIMELINE_BARS = 120     # switch the timeline from weeks to months / quarters above this
+SCATTER_TEXT_LIMIT = 150    # no per-point set labels above this (the set number stays in the hover)
+SCATTERGL_THRESHOLD = 1000  # WebGL scatter traces above this
 
+# ---------- Timeline Chart ----------
 group_colors = {
     "Sponsored": "red",
     "Ninjago": "#61F47F",
@@ -118,52 +128,59 @@ group_colors = {
     "Other": "lightgray"
 }
 
-fig_timeline = px.bar(
-    df_grouped,
-    x="upload_week_label",
-    y="count",
-    color="group",
-    color_discrete_map=group_colors,
-    category_orders={"upload_week_label": week_order, "group": ["Other", "Star Wars", "Ninjago", "Sponsored"]}
-)
-fig_timeline.update_layout(
-    template="plotly_dark",
-    #title=None,
-    barmode='stack',
-    xaxis_title="Upload Week",
-    yaxis_title="Number of Reviews",
-    height=450
-)
-st.plotly_chart(fig_timeline, use_container_width=True)
+# figures are serialized once per filter selection and only deserialized on reruns
+@st.cache_data(max_entries=256)
+def timeline_figure_json(data_version, years, themes, sponsored_filter):
+    cube = select_cube(years, themes, sponsored_filter)
+    bucket = choose_timeline_bucket(cube, MAX_TIMELINE_BARS)
+    df_grouped = count_timeline(cube, bucket)
+    period_order = sorted(df_grouped['period'].unique())
+
+    fig_timeline = px.bar(
+        df_grouped,
+        x="period",
+        y="count",
+        color="group",
+        color_discrete_map=group_colors,
+        category_orders={"period": period_order, "group": ["Other", "Star Wars", "Ninjago", "Sponsored"]}
+    )
+    fig_timeline.update_layout(
+        template="plotly_dark",
+        #title=None,
+        barmode='stack',
+        xaxis_title=f"Upload {bucket.title()}",
+        yaxis_title="Number of Reviews",
+        height=450
+    )
+    return fig_timeline.to_json()
+
+st.plotly_chart(pio.from_json(timeline_figure_json(data_version, selected_years, selected_themes, sponsored_filter)), use_container_width=True)
+stopwatch.lap("timeline")
 st.markdown("---")
 st.subheader("🎯 Average Rating vs Review Count (on Set Level)")
 
 # ---------- Scatter Plot ----------
-set_summary = filtered_df.groupby('lego_number').agg(
-    avg_review_score=('review_score', 'mean'),
-    review_count=('video_id', 'count'),
-    total_views=('views', 'sum'),
-    sponsored_any=('sponsored', 'any'),
-    SetName=('SetName', 'first'),
-    Theme=('Theme', 'first')
-).dropna().reset_index()
-
-if set_summary.empty:
-    st.warning("⚠️ No data for the current filter selection. Please try a different combination.")
-else:
+@st.cache_data(max_entries=256)
+def scatter_figure_json(data_version, years, themes, sponsored_filter):
+    set_summary = summarize_sets(select_cube(years, themes, sponsored_filter))
+    if set_summary.empty:
+        return None
+
     set_summary['size_scaled'] = set_summary['total_views'].clip(lower=1)
     max_size = set_summary['size_scaled'].max()
     sizeref = 1 if pd.isna(max_size) or max_size == 0 else 2. * max_size / (40. ** 2)
     theme_colors = {'Ninjago': "#61F47F", 'Star Wars': "#9D9D9D"}
+    Scatter = go.Scattergl if len(set_summary) > SCATTERGL_THRESHOLD else go.Scatter
+    point_mode = 'markers+text' if len(set_summary) <= SCATTER_TEXT_LIMIT else 'markers'
 
     fig = go.Figure()
 
     for theme in ['Ninjago', 'Star Wars']:
         subset = set_summary[set_summary['Theme'] == theme]
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=subset['review_count'],
             y=subset['avg_review_score'],
-            mode='markers+text',
+            mode=point_mode,
             name=theme,
             text=subset['lego_number'],
             hovertemplate=(
@@ -182,7 +199,7 @@ else:
         ))
 
     sponsored_sets = set_summary[set_summary['sponsored_any']]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(Scatter(
         x=sponsored_sets['review_count'],
         y=sponsored_sets['avg_review_score'],
         mode='markers',
@@ -207,23 +224,22 @@ else:
         height=600,
         legend_title="Themes / Sponsorship"
     )
+    return fig.to_json()
 
-    st.plotly_chart(fig, use_container_width=True)
+scatter_json = scatter_figure_json(data_version, selected_years, selected_themes, sponsored_filter)
+if scatter_json is None:
+    st.warning("⚠️ No data for the current filter selection. Please try a different combination.")
+else:
+    st.plotly_chart(pio.from_json(scatter_json), use_container_width=True)
+stopwatch.lap("scatter")
 
 # ---------- Heatmap: Sponsorship vs. Rating ----------
 st.markdown("---")
 st.subheader("📤 Sponsorship vs. Average Rating (Uploader Level)")
 
-reliable_uploaders = filtered_df.groupby('uploader').filter(lambda x: len(x) >= 3)
-
-uploader_binned = reliable_uploaders.groupby('uploader').agg(
-    avg_score=('review_score', 'mean'),
-    sponsored_ratio=('sponsored', 'mean')
-).dropna().reset_index()
+uploader_binned = uploader_scores[['uploader', 'avg_score', 'sponsored_ratio']].copy()
 
-uploader_binned['sponsored_bin'] = uploader_binned['sponsored_ratio'].apply(
-    lambda x: 'sponsored' if x >= 0.1 else 'not sponsored'
-)
+uploader_binned['sponsored_bin'] = np.where(uploader_binned['sponsored_ratio'] >= 0.1, 'sponsored', 'not sponsored')
 
 rating_bins = pd.IntervalIndex.from_tuples([
     (1.0, 1.5), (1.5, 2.0), (2.0, 2.5),
@@ -262,6 +278,7 @@ fig_heatmap2.update_layout(
     xaxis=dict(showticklabels=False)
 )
 st.plotly_chart(fig_heatmap2, use_container_width=True)
+stopwatch.lap("heatmap")
 
 # ---------- Top Critics & Fans ----------
 st.markdown("---")
@@ -276,37 +293,33 @@ def color_label(category):
     }
     return mapping.get(category, category)
 
-review_summaries = filtered_df.groupby(['uploader', 'SetName', 'Theme'])['review_category'].apply(list).reset_index()
-
-def make_expansion_html(uploader):
-    rows = review_summaries[review_summaries['uploader'] == uploader]
-    items = []
-    for _, row in rows.iterrows():
-        for cat in row['review_category']:
-            label = color_label(cat)
-            items.append(f"<li>{row['Theme']} <b>{row['SetName']}</b>: {label}</li>")
+def make_expansion_html(details):
+    items = [f"<li>{theme} <b>{set_name}</b>: {color_label(category)}</li>" for theme, set_name, category in details]
     return "<ul style='margin:0; padding-left:16px'>" + "\n".join(items) + "</ul>"
 
-uploader_scores = reliable_uploaders.groupby('uploader').agg(
-    avg_score=('review_score', 'mean'),
-    video_count=('video_id', 'count'),
-    total_views=('views', 'sum'),
-    sponsored_ratio=('sponsored', 'mean')
-).dropna().reset_index()
-
 def format_sponsoring(ratio):
-    if ratio == 0 or pd.isna(ratio):
-        return '<span style="color: gray;">not sponsored</span>'
-    else:
-        percent = int(round(ratio * 100))
-        return f'<span style="color: red;"><b>{percent} %</b> sponsored</span>'
-
-uploader_scores['Sponsorship'] = uploader_scores['sponsored_ratio'].apply(format_sponsoring)
-uploader_scores['DetailsHTML'] = uploader_scores['uploader'].apply(make_expansion_html)
+    percent = (ratio * 100).round().astype('Int64').astype(str)
+    return np.where(
+        ratio.fillna(0) == 0,
+        '<span style="color: gray;">not sponsored</span>',
+        '<span style="color: red;"><b>' + percent + ' %</b> sponsored</span>'
+    )
 
 top_fans = uploader_scores.sort_values(by=['avg_score', 'total_views'], ascending=[False, False]).head(10)
 top_critics = uploader_scores.sort_values(by=['avg_score', 'total_views'], ascending=[True, False]).head(10)
 
+# HTML only for the uploaders that are actually rendered
+shown_details = review_details(filtered_df, pd.concat([top_fans['uploader'], top_critics['uploader']]).unique())
+
+def add_display_columns(top):
+    return top.assign(
+        Sponsorship=format_sponsoring(top['sponsored_ratio']),
+        DetailsHTML=[make_expansion_html(shown_details[uploader]) for uploader in top['uploader']]
+    )
+
+top_fans = add_display_columns(top_fans)
+top_critics = add_display_columns(top_critics)
+
 def render_accordion_table(df):
     rows_html = ""
     for _, row in df.iterrows():
@@ -326,3 +339,20 @@ with col1:
 with col2:
     st.markdown("### 💔 Top 10 Critics")
     st.markdown(render_accordion_table(top_critics), unsafe_allow_html=True)
+stopwatch.lap("top_uploaders")
+
+# ---------- Perf panel (hidden, open the dashboard with ?perf=1) ----------
+if st.query_params.get("perf"):
+    summary = perf.REGISTRY.summary()
+    st.markdown("---")
+    st.subheader("⏱️ Render Times")
+    st.dataframe(pd.DataFrame([
+        {
+            "section": name,
+            "this run (ms)": seconds * 1000,
+            **{f"p{q} (ms)": summary[f"dashboard.{name}"][f"p{q}_s"] * 1000 for q in (50, 95, 99)},
+            "reruns": summary[f"dashboard.{name}"]["count"],
+        }
+        for name, seconds in stopwatch.laps
+    ]).round(1), hide_index=True, use_container_width=True)
+    st.caption(f"Total {sum(seconds for _, seconds in stopwatch.laps) * 1000:.0f} ms · percentiles over all reruns of this server process")
@@ -0,0 +1,176 @@
+import functools
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+PERF_DIR = "data/perf"
+JSONL_PATH = os.path.join(PERF_DIR, "metrics.jsonl")  # one line per metric and export, appended
+MAX_SAMPLES = 10_000  # durations kept per metric (reservoir sample), enough for stable p99
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Metric:
+    """Durations, items and tokens of one timed section."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.items = 0
+        self.tokens = 0
+        self.samples = []
+
+    def add(self, seconds, items=0, tokens=0):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.items += items
+        self.tokens += tokens
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = seconds
+
+    def quantile(self, q):
+        # nearest rank on the sample
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            **{f"p{round(q * 100)}_s": self.quantile(q) for q in QUANTILES},
+            "max_s": self.max,
+            "items": self.items,
+            "items_per_s": self.items / self.total if self.total else 0.0,
+            "tokens": self.tokens,
+            "tokens_per_s": self.tokens / self.total if self.total else 0.0,
+        }
+
+class Registry:
+    """Thread-safe collection of metrics; the module-level REGISTRY is shared by all code in a process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, items=0, tokens=0):
+        with self._lock:
+            metric = self._metrics.get(name) or self._metrics.setdefault(name, Metric(name))
+            metric.add(seconds, items, tokens)
+
+    def summary(self):
+        with self._lock:
+            return {name: metric.summary() for name, metric in sorted(self._metrics.items())}
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+REGISTRY = Registry()
+
+# ---------- Timers ----------
+class Timing:
+    """Handed out by timer(); set .items / .tokens inside the block when they are only known there."""
+
+    def __init__(self, items=0, tokens=0):
+        self.items = items
+        self.tokens = tokens
+        self.seconds = 0.0
+
+@contextmanager
+def timer(name, items=0, tokens=0, registry=None):
+    """with timer("yt.search"): ... records the duration (also when the block raises)."""
+    timing = Timing(items, tokens)
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing.seconds = time.perf_counter() - start
+        (registry or REGISTRY).record(name, timing.seconds, timing.items, timing.tokens)
+
+def timed(name, items=None):
+    """Decorator version of timer(); items(*args, **kwargs) may count the items of a call."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, items(*args, **kwargs) if items else 1):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class Stopwatch:
+    """Section times of a top-to-bottom script (a dashboard rerun): lap(name) closes the section since the last lap."""
+
+    def __init__(self, prefix, registry=None):
+        self.prefix = prefix
+        self.registry = registry or REGISTRY
+        self.laps = []
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        self.laps.append((name, seconds))
+        self.registry.record(f"{self.prefix}.{name}", seconds, items=1)
+        return seconds
+
+# ---------- Reports & export ----------
+def report(registry=None):
+    summary = (registry or REGISTRY).summary()
+    if not summary:
+        return
+    print(f"\n⏱️ {'section':<28} {'count':>7} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>9} {'tokens/s':>9}")
+    for name, stats in summary.items():
+        print(f"   {name:<28} {stats['count']:>7} {stats['total_s']:>9.1f} {stats['p50_s'] * 1000:>9.1f} "
+              f"{stats['p95_s'] * 1000:>9.1f} {stats['p99_s'] * 1000:>9.1f} {stats['items_per_s']:>9.2f} {stats['tokens_per_s']:>9.1f}")
+
+def write_jsonl(job, path=JSONL_PATH, registry=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    timestamp = time.time()
+    with open(path, "a", encoding="utf-8") as f:
+        for name, stats in (registry or REGISTRY).summary().items():
+            f.write(json.dumps({"ts": timestamp, "job": job, "metric": name, **stats}) + "\n")
+
+def prometheus_text(job, registry=None):
+    """Prometheus text format (summary + counters), e.g. for the node_exporter textfile collector."""
+    lines = [
+        "# HELP lego_section_seconds Duration of an instrumented section.",
+        "# TYPE lego_section_seconds summary",
+    ]
+    counters = {"items": [], "tokens": []}
+    for name, stats in (registry or REGISTRY).summary().items():
+        labels = f'job="{job}",section="{name}"'
+        for q in QUANTILES:
+            lines.append(f'lego_section_seconds{{{labels},quantile="{q}"}} {stats[f"p{round(q * 100)}_s"]:.6f}')
+        lines.append(f"lego_section_seconds_sum{{{labels}}} {stats['total_s']:.6f}")
+        lines.append(f"lego_section_seconds_count{{{labels}}} {stats['count']}")
+        counters["items"].append(f"lego_section_items_total{{{labels}}} {stats['items']}")
+        counters["tokens"].append(f"lego_section_tokens_total{{{labels}}} {stats['tokens']}")
+    for kind, rows in counters.items():
+        lines += [f"# HELP lego_section_{kind}_total {kind.capitalize()} processed in a section.",
+                  f"# TYPE lego_section_{kind}_total counter", *rows]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(job, path=None, registry=None):
+    path = path or os.path.join(PERF_DIR, f"{job}.prom")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # written to a temp file first, a scraper never sees a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(job, registry))
+    os.replace(tmp_path, path)
+
+def export(job, registry=None):
+    """Prints the table and writes JSON lines + the Prometheus file of a finished run."""
+    report(registry)
+    write_jsonl(job, registry=registry)
+    write_prometheus(job, registry=registry)
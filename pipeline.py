@@ -0,0 +1,308 @@
+import argparse
+import threading
+import time
+import requests
+import yt_dlp
+import analyze_transcripts
+import perf
+import storage
+import yt_extract
+
+DB_PATH = storage.DB_PATH
+
+# ⚙️ Queue settings
+MAX_ATTEMPTS = 4        # a job fails for good after this many attempts
+BACKOFF_BASE = 10.0     # seconds before the first retry, doubled for every further attempt
+BACKOFF_MAX = 600.0
+POLL_INTERVAL = 0.5     # seconds an idle worker sleeps before looking for new jobs
+MAX_RETRY_WAIT = 60.0   # once the upstream stages are done, retries further out are left for the next run
+
+SEARCH, TRANSCRIPT, CLASSIFY = "search", "transcript", "classify"
+
+# ---------- Job queue (table jobs, see storage.py) ----------
+def enqueue(conn, stage, items, requeue_done=False):
+    """Adds pending jobs; existing jobs are left alone, finished ones are reopened with requeue_done."""
+    conflict = "DO NOTHING"
+    if requeue_done:
+        conflict = """DO UPDATE SET status = 'pending', attempts = 0, next_attempt_at = 0, last_error = NULL,
+                      updated_at = excluded.updated_at WHERE jobs.status = 'done'"""
+    now = time.time()
+    conn.executemany(f"""
+        INSERT INTO jobs (stage, item, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(stage, item) {conflict}
+    """, [(stage, str(item), now) for item in items])
+
+def reset_interrupted(conn):
+    # jobs still marked running belong to a run that crashed or was stopped; they start over
+    with conn:
+        return conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'").rowcount
+
+def retry_failed(conn):
+    with conn:
+        return conn.execute("""
+            UPDATE jobs SET status = 'pending', attempts = 0, next_attempt_at = 0 WHERE status = 'failed'
+        """).rowcount
+
+def claim(conn, stage, batch_size):
+    """Marks up to batch_size due jobs of a stage as running and returns their items."""
+    now = time.time()
+    # BEGIN IMMEDIATE: two workers of the same stage never claim the same job
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        items = [row[0] for row in conn.execute("""
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ?
+            WHERE rowid IN (
+                SELECT rowid FROM jobs
+                WHERE stage = ? AND status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, rowid
+                LIMIT ?
+            )
+            RETURNING item
+        """, (now, stage, now, batch_size)).fetchall()]
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return items
+
+def finish(conn, stage, results, next_stage=None, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE,
+           backoff_max=BACKOFF_MAX):
+    """Stores handler results: done (follow-up items go to next_stage in the same commit), retry later or failed."""
+    now = time.time()
+    done, follow_ups, errors = [], [], []
+    for item, result in results.items():
+        if isinstance(result, Exception):
+            errors.append((item, f"{type(result).__name__}: {result}"))
+        else:
+            done.append(item)
+            follow_ups.extend(result)
+    with conn:
+        conn.executemany("""
+            UPDATE jobs SET status = 'done', last_error = NULL, updated_at = ? WHERE stage = ? AND item = ?
+        """, [(now, stage, item) for item in done])
+        if next_stage and follow_ups:
+            enqueue(conn, next_stage, follow_ups, requeue_done=True)
+        conn.executemany("""
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            next_attempt_at = ? + MIN(? * (1 << (attempts - 1)), ?),
+                            last_error = ?, updated_at = ?
+            WHERE stage = ? AND item = ?
+        """, [(max_attempts, now, backoff_base, backoff_max, error, now, stage, item) for item, error in errors])
+    for item, error in errors:
+        print(f"🔁 {stage} {item}: {error}")
+
+def status_counts(conn):
+    """{stage: {status: count}}"""
+    counts = {}
+    for stage, status, count in conn.execute("SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status"):
+        counts.setdefault(stage, {})[status] = count
+    return counts
+
+def print_status(conn):
+    for stage, counts in status_counts(conn).items():
+        print(f"📋 {stage:<10} " + ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+
+# ---------- Runner ----------
+class Stage:
+    """A pipeline step: handler(conn, items) returns {item: [follow-up items for the next stage] or an Exception}.
+
+    Items missing from the result count as failed; an exception raised by the handler fails the whole batch.
+    """
+
+    def __init__(self, name, handler, workers=1, batch_size=1):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+
+class Pipeline:
+    """Runs the stages at the same time, connected by the jobs table; each stage feeds the next one.
+
+    Every worker thread has its own connection. A stage stops once all stages before it have stopped
+    and none of its jobs is pending or running (retries further out than max_retry_wait stay pending
+    for the next run). Jobs left running by an interrupted run are queued again on start.
+    """
+
+    def __init__(self, stages, db_path=DB_PATH, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, poll_interval=POLL_INTERVAL, max_retry_wait=MAX_RETRY_WAIT):
+        self.stages = stages
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.max_retry_wait = max_retry_wait
+
+    def run(self):
+        conn = storage.connect(self.db_path)
+        interrupted = reset_interrupted(conn)
+        if interrupted:
+            print(f"♻️ {interrupted} interrupted jobs are queued again")
+
+        self._finished = [threading.Event() for _ in self.stages]
+        self._active = [stage.workers for stage in self.stages]
+        self._lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self._work, args=(index,), name=f"{stage.name}-{number}", daemon=True)
+            for index, stage in enumerate(self.stages) for number in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print_status(conn)
+        conn.close()
+
+    def _idle_wait(self, conn, stage, upstream_done):
+        """Seconds until this stage may have work again, None if it has nothing left."""
+        if conn.execute("SELECT 1 FROM jobs WHERE stage = ? AND status = 'running' LIMIT 1", (stage,)).fetchone():
+            return self.poll_interval  # a failing job of another worker may come back as a retry
+        next_attempt_at = conn.execute(
+            "SELECT MIN(next_attempt_at) FROM jobs WHERE stage = ? AND status = 'pending'", (stage,)
+        ).fetchone()[0]
+        if not upstream_done:
+            return self.poll_interval
+        if next_attempt_at is None or next_attempt_at - time.time() > self.max_retry_wait:
+            return None
+        return max(0.0, min(self.poll_interval, next_attempt_at - time.time()))
+
+    def _work(self, index):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1].name if index + 1 < len(self.stages) else None
+        conn = storage.connect(self.db_path)
+        try:
+            while True:
+                items = claim(conn, stage.name, stage.batch_size)
+                if items:
+                    try:
+                        with perf.timer(f"stage.{stage.name}", items=len(items)):
+                            results = stage.handler(conn, items)
+                        missing = RuntimeError("no result from stage handler")
+                    except Exception as e:
+                        conn.rollback()
+                        results, missing = {}, e
+                    finish(conn, stage.name, {item: results.get(item, missing) for item in items}, next_stage,
+                           self.max_attempts, self.backoff_base, self.backoff_max)
+                    continue
+                # upstream state is read before the queue, so a job they add just before stopping is not missed
+                upstream_done = all(event.is_set() for event in self._finished[:index])
+                wait = self._idle_wait(conn, stage.name, upstream_done)
+                if wait is None:
+                    break
+                time.sleep(wait)
+        finally:
+            conn.close()
+            with self._lock:
+                self._active[index] -= 1
+                if not self._active[index]:
+                    self._finished[index].set()
+
+# ---------- Stages of the LEGO review pipeline ----------
+def search_handler(rate_limiter, max_results=50):
+    def handle(conn, numbers):
+        results = {}
+        for number in numbers:
+            try:
+                entries = yt_extract.fetch_search_results(f"LEGO {number} review", max_results, rate_limiter=rate_limiter)
+                results[number] = yt_extract.store_search_results(conn, yt_extract.filter_search_results(entries), number)
+            except Exception as e:
+                results[number] = e
+        return results
+    return handle
+
+def transcript_handler(rate_limiter, ydl_factory=None):
+    ydl_factory = ydl_factory or (lambda: yt_dlp.YoutubeDL(yt_extract.TRANSCRIPT_YDL_OPTS))
+    local = threading.local()
+
+    def handle(conn, video_ids):
+        if not hasattr(local, "ydl"):
+            local.ydl = ydl_factory()
+            local.session = requests.Session()
+        results, rows = {}, []
+        for video_id in video_ids:
+            if video_id in yt_extract.known_detail_ids:
+                results[video_id] = [video_id]
+                continue
+            result = yt_extract.fetch_transcript(video_id, local.ydl, local.session, rate_limiter)
+            if result is None:
+                results[video_id] = []  # restricted or without English captions, nothing to classify
+            elif result[2] is None:
+                # error text instead of captions: retried by the queue instead of being stored and classified
+                results[video_id] = RuntimeError(result[1])
+            else:
+                rows.append((video_id, *result))
+                results[video_id] = [video_id]
+        with conn:
+            storage.insert_transcripts(conn, rows)
+        with yt_extract.known_ids_lock:
+            yt_extract.known_detail_ids.update(row[0] for row in rows)
+        return results
+    return handle
+
+def classify_handler(runnable=None, max_concurrency=analyze_transcripts.MAX_CONCURRENCY):
+    runnable = runnable or analyze_transcripts.classifier
+
+    def handle(conn, video_ids):
+        rows = analyze_transcripts.unclassified_rows(conn, video_ids)
+        if rows:
+            analyze_transcripts.classify_page(conn, rows, runnable, max_concurrency)
+        placeholders = ",".join(["?"] * len(video_ids))
+        classified = {row[0] for row in conn.execute(f"""
+            SELECT video_id FROM video_details WHERE video_id IN ({placeholders}) AND review_category IS NOT NULL
+        """, video_ids)}
+        # videos without transcript_hash have nothing to classify and are done as well
+        pending = {row[0] for row in rows}
+        return {video_id: RuntimeError("not classified, see log above") if video_id in pending and video_id not in classified else []
+                for video_id in video_ids}
+    return handle
+
+def build_stages(search_workers=yt_extract.SEARCH_WORKERS, transcript_workers=yt_extract.TRANSCRIPT_WORKERS,
+                 min_interval=yt_extract.HOST_MIN_INTERVAL):
+    rate_limiter = yt_extract.HostRateLimiter(min_interval)
+    return [
+        Stage(SEARCH, search_handler(rate_limiter), workers=search_workers),
+        Stage(TRANSCRIPT, transcript_handler(rate_limiter), workers=transcript_workers, batch_size=5),
+        # one classifier worker, the LLM batch inside classify_page is already parallel
+        Stage(CLASSIFY, classify_handler(), batch_size=analyze_transcripts.PAGE_SIZE),
+    ]
+
+def seed_jobs(conn, csv_files=()):
+    """Queues the work the database still needs; jobs that already exist keep their state."""
+    yt_extract.load_known_ids(conn)
+    if csv_files:
+        yt_extract.load_legosets_from_csv(conn, *csv_files)
+    sets = [row[0] for row in conn.execute("""
+        SELECT Number FROM legosets
+        WHERE LOWER(PackagingType) = 'box'
+        AND Number NOT IN (SELECT DISTINCT lego_number FROM videos)
+    """)]
+    unclassified = [row[0] for row in conn.execute(analyze_transcripts.UNCLASSIFIED_QUERY)]
+    with conn:
+        enqueue(conn, SEARCH, sets)
+        enqueue(conn, TRANSCRIPT, yt_extract.pending_transcript_ids())
+        enqueue(conn, CLASSIFY, unclassified)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search, transcript and classification stages as one resumable run.")
+    parser.add_argument("csv_files", nargs="*", default=yt_extract.LEGOSET_CSV_FILES, help="LEGO set CSV files to load first")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--retry-failed", action="store_true", help="queue failed jobs again")
+    parser.add_argument("--status", action="store_true", help="only print the job counts")
+    parser.add_argument("--min-interval", type=float, default=yt_extract.HOST_MIN_INTERVAL,
+                        help="seconds between two requests to the same host")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    conn = storage.connect(args.db)
+    if args.status:
+        print_status(conn)
+    else:
+        if args.retry_failed:
+            print(f"🔁 {retry_failed(conn)} failed jobs queued again")
+        seed_jobs(conn, args.csv_files)
+        print_status(conn)
+        Pipeline(build_stages(min_interval=args.min_interval), args.db).run()
+        elapsed_time = time.time() - start_time
+        print(f"✅ Pipeline done! ⏱️ Runtime: {int(elapsed_time // 60)} min {int(elapsed_time % 60)} sec")
+        perf.export("pipeline")
+    conn.close()
@@ -0,0 +1,413 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import zlib
+
+import perf
+
+DB_PATH = "data/lego_reviews.db"
+BUSY_TIMEOUT = 30.0    # seconds a connection waits for a lock held by another script
+WRITE_BATCH_SIZE = 500  # rows per transaction in BatchedWriter
+COMPRESSION_LEVEL = 6   # zlib level for transcripts and descriptions
+MIGRATION_CHUNK_SIZE = 1000
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+SEARCH_WEIGHTS = (4.0, 1.0, 1.0)  # bm25 weights of title, description, transcript
+
+# 🧱 Base tables; legosets gets further columns from the CSV files (see add_missing_columns)
+BASE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS legosets (
+        Number TEXT, SetName TEXT, Theme TEXT, PackagingType TEXT, LaunchDate TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS videos (
+        video_id TEXT, title TEXT, uploader TEXT, upload_date TEXT, views INTEGER,
+        duration INTEGER, transcript TEXT, languages TEXT, lego_number TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS video_details (
+        video_id TEXT, description TEXT, transcript TEXT
+    )""",
+]
+
+# 🧠 Columns written by analyze_transcripts.py
+ANALYSIS_COLUMNS = {
+    "review_category": "TEXT",
+    "review_rationale": "TEXT",
+    "confidence_score": "INTEGER",
+    "sponsored": "BOOLEAN",
+    "transcript_word_count": "INTEGER",
+    "transcript_char_length": "INTEGER",
+    "sponsor_rule": "TEXT",
+    "updated_at": "TEXT",  # read by the dashboard to find re-classified rows
+}
+
+# 🔎 Join and filter keys of the extractor, analyzer and dashboard queries
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_legosets_number ON legosets(Number)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_video_id ON videos(video_id)",
+    "CREATE INDEX IF NOT EXISTS idx_videos_lego_number ON videos(lego_number)",
+    "CREATE INDEX IF NOT EXISTS idx_videos_upload_date ON videos(upload_date)",
+    "CREATE INDEX IF NOT EXISTS idx_video_details_video_id ON video_details(video_id)",
+    "CREATE INDEX IF NOT EXISTS idx_video_details_updated_at ON video_details(updated_at)",
+    # only the analyzer backlog, stays small once most videos are classified
+    "CREATE INDEX IF NOT EXISTS idx_video_details_unclassified ON video_details(video_id) WHERE review_category IS NULL",
+]
+
+# ---------- Migrations ----------
+def add_missing_columns(conn, table, columns):
+    existing_columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+    for column, coltype in columns.items():
+        if column not in existing_columns:
+            print(f"➕ Adding column '{column}' to table '{table}'")
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {coltype}')
+
+def _create_base_tables(conn):
+    for statement in BASE_TABLES:
+        conn.execute(statement)
+
+def _add_analysis_columns(conn):
+    add_missing_columns(conn, "video_details", ANALYSIS_COLUMNS)
+
+def _create_indexes(conn):
+    for statement in INDEXES:
+        try:
+            conn.execute(statement)
+        except sqlite3.IntegrityError:
+            # older databases may hold duplicates; the queries still work, just without this index
+            print(f"⚠️ Skipping index, duplicate keys: {statement}")
+
+def _create_classification_cache(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS classification_cache (
+            cache_key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_classification_cache_last_used ON classification_cache(last_used_at)")
+
+def _move_transcripts_to_side_table(conn):
+    # video_details keeps the small metadata, the text lives compressed in transcripts
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transcripts (
+            video_id TEXT PRIMARY KEY,
+            description BLOB,
+            transcript BLOB
+        )
+    """)
+    add_missing_columns(conn, "video_details", {"transcript_hash": "TEXT"})
+    if "transcript" not in {row[1] for row in conn.execute("PRAGMA table_info(video_details)")}:
+        return False
+
+    moved, last_rowid = 0, 0
+    while True:
+        rows = conn.execute("""
+            SELECT rowid, video_id, description, transcript FROM video_details WHERE rowid > ? ORDER BY rowid LIMIT ?
+        """, (last_rowid, MIGRATION_CHUNK_SIZE)).fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+        conn.executemany("INSERT OR IGNORE INTO transcripts (video_id, description, transcript) VALUES (?, ?, ?)",
+                         [(video_id, compress_text(description), compress_text(transcript))
+                          for _, video_id, description, transcript in rows])
+        conn.executemany("""
+            UPDATE video_details SET transcript_hash = ?, transcript_word_count = ?, transcript_char_length = ?
+            WHERE rowid = ?
+        """, [(*transcript_stats(transcript), rowid) for rowid, _, _, transcript in rows])
+        moved += len(rows)
+        print(f"📦 {moved} transcripts moved to the transcripts table")
+    conn.execute("ALTER TABLE video_details DROP COLUMN transcript")
+    conn.execute("ALTER TABLE video_details DROP COLUMN description")
+    return moved > 0  # the freed pages are only returned to the file system by VACUUM
+
+def _add_transcript_segments(conn):
+    # (start_ms, text) per caption segment; rows from before keep only the joined transcript
+    add_missing_columns(conn, "transcripts", {"segments": "BLOB"})
+
+def _create_search_index(conn):
+    # contentless FTS5: the text stays compressed in transcripts, the index holds only tokens.
+    # Its rowids are docids from search_docs; videos.rowid is no key, VACUUM renumbers it.
+    conn.execute("CREATE TABLE IF NOT EXISTS search_docs (docid INTEGER PRIMARY KEY, video_id TEXT UNIQUE NOT NULL)")
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5(
+            title, description, transcript, content='', tokenize='{SEARCH_TOKENIZER}'
+        )
+    """)
+    index_all_transcripts(conn)
+
+def _create_jobs_table(conn):
+    # work queue of pipeline.py: one row per (stage, item), status pending -> running -> done / failed
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            stage TEXT NOT NULL,
+            item TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            updated_at REAL,
+            PRIMARY KEY (stage, item)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(stage, status, next_attempt_at)")
+
+def _rekey_search_index(conn):
+    # the index of version 7 was keyed by videos.rowid and pointed at other videos after a VACUUM; built again on docids.
+    # With search_docs present, step 7 of this run already built the docid index, indexing twice would be wasted
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_docs'").fetchone():
+        return
+    conn.execute("DROP TABLE IF EXISTS transcript_search")
+    _create_search_index(conn)
+
+def _count_legoset_changes(conn):
+    # legosets rows are updated in place, MAX(rowid) misses that; the dashboard compares this counter instead
+    conn.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES ('legosets')")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS legosets_{event.lower()}_version AFTER {event} ON legosets
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = 'legosets';
+            END
+        """)
+
+# applied in order; the position + 1 is stored in PRAGMA user_version, so only append new steps
+MIGRATIONS = [
+    _create_base_tables,
+    _add_analysis_columns,
+    _create_indexes,
+    _create_classification_cache,
+    _move_transcripts_to_side_table,
+    _add_transcript_segments,
+    _create_search_index,
+    _create_jobs_table,
+    _rekey_search_index,
+    _count_legoset_changes,
+]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    # BEGIN IMMEDIATE takes the write lock first, so two scripts starting together don't both migrate
+    conn.execute("BEGIN IMMEDIATE")
+    vacuum = False
+    try:
+        version = schema_version(conn)
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            print(f"🛠️ Migrating database schema to version {number} ({step.__name__})")
+            # a step returns True when it freed a lot of space
+            vacuum = step(conn) or vacuum
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if vacuum:
+        print("🧹 Running VACUUM to shrink the database file")
+        conn.execute("VACUUM")
+
+# ---------- Connections ----------
+def connect(db_path=DB_PATH, check_same_thread=True):
+    """Connection with WAL, a busy timeout and the current schema; used by all scripts."""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=check_same_thread)
+    # WAL lets the dashboard read while the extractor or analyzer writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+    if schema_version(conn) < len(MIGRATIONS):
+        migrate(conn)
+    return conn
+
+# ---------- Transcripts (compressed side table, loaded only when the text is needed) ----------
+def compress_text(text):
+    return None if text is None else zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+def decompress_text(blob):
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+def encode_segments(segments):
+    # two parallel arrays, start times as deltas (mostly repeating values, so they compress well)
+    starts = [start for start, _ in segments]
+    deltas = [start - previous for start, previous in zip(starts, [0] + starts)]
+    return compress_text(json.dumps([deltas, [text for _, text in segments]], ensure_ascii=False, separators=(",", ":")))
+
+def decode_segments(blob):
+    if blob is None:
+        return None
+    deltas, texts = json.loads(decompress_text(blob))
+    return list(zip(itertools.accumulate(deltas), texts))
+
+def join_segments(segments):
+    return " ".join(text for _, text in segments).strip()
+
+def transcript_hash(transcript):
+    normalized = " ".join(transcript.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def transcript_stats(transcript):
+    """(hash, word count, char length) stored in video_details, computed once at ingest."""
+    if transcript is None:
+        return None, None, None
+    transcript = transcript.strip()
+    return transcript_hash(transcript), len(transcript.split()), len(transcript)
+
+def insert_transcripts(conn, rows):
+    """Inserts (video_id, description, transcript, segments) rows into video_details and transcripts; the caller commits.
+
+    Pass either the caption segments or, for error markers, a transcript text; the joined text is not stored
+    next to the segments but rebuilt by load_transcripts.
+    """
+    texts = [transcript if segments is None else join_segments(segments) for _, _, transcript, segments in rows]
+    conn.executemany("""
+        INSERT INTO video_details (video_id, transcript_hash, transcript_word_count, transcript_char_length)
+        VALUES (?, ?, ?, ?)
+    """, [(row[0], *transcript_stats(text)) for row, text in zip(rows, texts)])
+    # a contentless index can only forget a row given its old text, so replaced transcripts are unindexed first
+    replaced = load_transcripts(conn, [row[0] for row in rows])
+    update_search_index(conn, [(video_id, *old) for video_id, old in replaced.items()], delete=True)
+    conn.executemany("INSERT OR REPLACE INTO transcripts (video_id, description, transcript, segments) VALUES (?, ?, ?, ?)", [
+        (video_id, compress_text(description), compress_text(transcript) if segments is None else None,
+         None if segments is None else encode_segments(segments))
+        for video_id, description, transcript, segments in rows
+    ])
+    update_search_index(conn, [(row[0], row[1], text) for row, text in zip(rows, texts)])
+
+def _placeholders(values):
+    return ",".join(["?"] * len(values))
+
+def load_transcripts(conn, video_ids):
+    """{video_id: (description, transcript)} for the given videos, decompressed."""
+    video_ids = list(video_ids)
+    if not video_ids:
+        return {}
+    rows = conn.execute(f"""
+        SELECT video_id, description, transcript, segments FROM transcripts WHERE video_id IN ({_placeholders(video_ids)})
+    """, video_ids)
+    return {
+        video_id: (decompress_text(description),
+                   decompress_text(transcript) if segments is None else join_segments(decode_segments(segments)))
+        for video_id, description, transcript, segments in rows
+    }
+
+def load_segments(conn, video_ids):
+    """{video_id: [(start_ms, text), ...]} for the given videos; videos stored before segments are missing."""
+    video_ids = list(video_ids)
+    if not video_ids:
+        return {}
+    rows = conn.execute(f"""
+        SELECT video_id, segments FROM transcripts WHERE segments IS NOT NULL AND video_id IN ({_placeholders(video_ids)})
+    """, video_ids)
+    return {video_id: decode_segments(segments) for video_id, segments in rows}
+
+# ---------- Full-text search ----------
+def update_search_index(conn, rows, delete=False):
+    """Adds (or with delete=True removes) (video_id, description, transcript) rows in transcript_search.
+
+    The title comes from videos; transcripts of videos without a videos row are not searchable.
+    """
+    if not rows:
+        return
+    video_ids = [video_id for video_id, _, _ in rows]
+    if not delete:
+        conn.execute(f"""
+            INSERT OR IGNORE INTO search_docs (video_id)
+            SELECT video_id FROM videos WHERE video_id IN ({_placeholders(video_ids)})
+        """, video_ids)
+    titles = {video_id: (docid, title) for docid, video_id, title in conn.execute(f"""
+        SELECT s.docid, v.video_id, v.title FROM videos v JOIN search_docs s ON s.video_id = v.video_id
+        WHERE v.video_id IN ({_placeholders(video_ids)})
+    """, video_ids)}
+    command = "'delete', " if delete else ""
+    conn.executemany(f"""
+        INSERT INTO transcript_search ({"transcript_search, " if delete else ""}rowid, title, description, transcript)
+        VALUES ({command}?, ?, ?, ?)
+    """, [(*titles[video_id], description, transcript) for video_id, description, transcript in rows if video_id in titles])
+
+def index_all_transcripts(conn, chunk_size=MIGRATION_CHUNK_SIZE):
+    indexed, last_id = 0, ""
+    while True:
+        video_ids = [row[0] for row in conn.execute(
+            "SELECT video_id FROM transcripts WHERE video_id > ? ORDER BY video_id LIMIT ?", (last_id, chunk_size)
+        )]
+        if not video_ids:
+            break
+        last_id = video_ids[-1]
+        texts = load_transcripts(conn, video_ids)
+        update_search_index(conn, [(video_id, *texts[video_id]) for video_id in video_ids])
+        indexed += len(video_ids)
+        print(f"🔎 {indexed} transcripts added to the search index")
+
+def plain_search_query(query):
+    # every word as a quoted term, for input that is not valid FTS5 syntax
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+def search_transcripts(conn, query, limit=-1):
+    """[(video_id, title, rank)] for an FTS5 query, best match first (bm25, lower is better).
+
+    Accepts FTS5 syntax ("price per piece" OR LAN, lego*); anything that does not parse is
+    searched as plain words instead.
+    """
+    # ranked and limited inside the FTS5 query, the join only touches the rows that are returned
+    sql = f"""
+        SELECT v.video_id, v.title, hits.rank
+        FROM (
+            SELECT rowid, bm25(transcript_search, {", ".join(map(str, SEARCH_WEIGHTS))}) AS rank
+            FROM transcript_search
+            WHERE transcript_search MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ) AS hits
+        JOIN search_docs s ON s.docid = hits.rowid
+        JOIN videos v ON v.video_id = s.video_id
+        ORDER BY hits.rank
+    """
+    try:
+        return conn.execute(sql, (query, limit)).fetchall()
+    except sqlite3.OperationalError:
+        return conn.execute(sql, (plain_search_query(query), limit)).fetchall()
+
+# ---------- Batched writes ----------
+class BatchedWriter:
+    """Collects parameter tuples and writes them with executemany, one commit per batch.
+
+    `sql` is a statement or a function write(conn, rows) for batches that span several tables
+    (e.g. insert_transcripts). Use as a context manager (the rest is flushed on exit) or call flush() yourself.
+    Every flush is timed as perf metric `name`; on_flush(rows) gets each batch after its commit.
+    """
+
+    def __init__(self, conn, sql, batch_size=WRITE_BATCH_SIZE, on_flush=None, name="db.batch"):
+        self.conn = conn
+        self.name = name
+        self.write = sql if callable(sql) else lambda conn, rows: conn.executemany(sql, rows)
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.rows = 0
+        self._batch = []
+
+    def __len__(self):
+        return len(self._batch)
+
+    def add(self, params):
+        self._batch.append(params)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            with self.conn, perf.timer(self.name, items=len(self._batch)):
+                self.write(self.conn, self._batch)
+            self.rows += len(self._batch)
+            if self.on_flush:
+                self.on_flush(list(self._batch))
+            self._batch.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
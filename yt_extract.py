@@ -1,185 +1,460 @@
-import sqlite3
 import yt_dlp
 from yt_dlp.utils import DownloadError
 from datetime import datetime
+import codecs
 import csv
+import hashlib
 import json
+import os
 import requests
+import sys
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import perf
+import storage
+from storage import BatchedWriter
 
-start_time = time.time()
+DB_PATH = storage.DB_PATH
 
-# 📌 Connect to SQLite database
-conn = sqlite3.connect("youtube_videos.db")
-cursor = conn.cursor()
+# ⚙️ Transcript fetch settings
+TRANSCRIPT_WORKERS = 4        # parallel yt-dlp/caption downloads
+HOST_MIN_INTERVAL = 1.0       # seconds between two requests to the same host (min_interval / --min-interval to change)
+WRITE_BATCH_SIZE = 25         # rows per INSERT batch into video_details
+WRITER_FLUSH_INTERVAL = 5.0   # flush a partial batch after this many idle seconds
+CAPTION_TIMEOUT = 30
+CAPTION_CHUNK_SIZE = 64 * 1024  # bytes per read while streaming the json3 captions
 
-# 📥 Load LEGO sets from CSV (only add new ones)
-def load_legosets_from_csv(csv_file_path):
+# ⚙️ Search settings
+SEARCH_WORKERS = 3
+SEARCH_CACHE_DIR = "cache/search"
+SEARCH_CACHE_TTL = 7 * 24 * 3600   # seconds until a cached search result is fetched again
+MIN_VIEWS = 500
+MIN_DURATION = 60
+CAPTION_LANGUAGES = ["en", "de", "da", "fr", "it"]
+
+SEARCH_YDL_OPTS = {
+    "quiet": True,
+    "sleep_interval": 3,
+    "max_sleep_interval": 4,
+}
+SEARCH_ENTRY_FIELDS = ["id", "title", "uploader", "upload_date", "view_count", "duration", "age_limit", "is_unavailable"]
+
+# ⚙️ CSV import settings
+LEGOSET_CSV_FILES = ["starwars_2025.csv"]
+CSV_CHUNK_SIZE = 1000
+
+TRANSCRIPT_YDL_OPTS = {
+    "quiet": True,
+    "writesubtitles": True,
+    "writeautomaticsub": True,
+    "subtitleslangs": ["en"],
+    "skip_download": True
+}
+
+# 🧠 Video IDs already stored (filled once by load_known_ids, kept up to date on insert)
+known_video_ids = set()
+known_detail_ids = set()
+known_ids_lock = threading.Lock()  # search and transcript workers update the sets concurrently
+
+def load_known_ids(conn):
+    known_video_ids.clear()
+    known_video_ids.update(row[0] for row in conn.execute("SELECT video_id FROM videos"))
+    known_detail_ids.clear()
+    known_detail_ids.update(row[0] for row in conn.execute("SELECT video_id FROM video_details"))
+    print(f"🧠 {len(known_video_ids)} known videos, {len(known_detail_ids)} with details")
+
+def pending_transcript_ids():
+    return sorted(known_video_ids - known_detail_ids)
+
+# 📥 Load LEGO sets from one or more CSV files (insert new sets, update changed ones)
+def _read_csv_chunks(csv_file_path, chunk_size):
     with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
         reader = csv.DictReader(csvfile)
-        new_count = 0
+        columns = [col.strip() for col in reader.fieldnames]
+        chunk = []
         for row in reader:
-            number = row["Number"].strip()
-            cursor.execute("SELECT 1 FROM legosets WHERE Number = ?", (number,))
-            if cursor.fetchone():
-                print(f"⚠️ Set {number} already exists, skipping...")
-                continue
-            values = tuple(row[col].strip() for col in reader.fieldnames)
-            placeholders = ",".join(["?"] * len(values))
-            cursor.execute(f"INSERT INTO legosets VALUES ({placeholders})", values)
-            new_count += 1
-        conn.commit()
-        print(f"✅ {new_count} new LEGO sets added to database.")
+            chunk.append(tuple((row[col] or "").strip() for col in reader.fieldnames))
+            if len(chunk) >= chunk_size:
+                yield columns, chunk
+                chunk = []
+        if chunk:
+            yield columns, chunk
+
+def _legoset_upsert_sql(columns):
+    quoted = [f'"{col}"' for col in columns]
+    values = [col for col in quoted if col != '"Number"']
+    if values:
+        updates = ", ".join(f"{col} = excluded.{col}" for col in values)
+        changed = " OR ".join(f"legosets.{col} IS NOT excluded.{col}" for col in values)
+        conflict = f"DO UPDATE SET {updates} WHERE {changed}"
+    else:
+        conflict = "DO NOTHING"  # a CSV with only set numbers has nothing to update
+    return f"""
+        INSERT INTO legosets ({", ".join(quoted)})
+        VALUES ({", ".join(["?"] * len(columns))})
+        ON CONFLICT(Number) {conflict}
+    """
+
+def load_legosets_from_csv(conn, *csv_file_paths, chunk_size=CSV_CHUNK_SIZE):
+    for csv_file_path in csv_file_paths:
+        total = changed = 0
+        before = conn.execute("SELECT COUNT(*) FROM legosets").fetchone()[0]
+        with conn, perf.timer("db.legosets") as timing:
+            for columns, chunk in _read_csv_chunks(csv_file_path, chunk_size):
+                if not total:
+                    # Brickset exports differ in their columns, unknown ones are added as TEXT
+                    storage.add_missing_columns(conn, "legosets", dict.fromkeys(columns, "TEXT"))
+                changed += conn.executemany(_legoset_upsert_sql(columns), chunk).rowcount
+                total += len(chunk)
+            timing.items = total
+        inserted = conn.execute("SELECT COUNT(*) FROM legosets").fetchone()[0] - before
+        updated = changed - inserted
+        print(f"✅ {csv_file_path}: {inserted} new, {updated} updated, {total - changed} unchanged LEGO sets")
+
+# 🔎 Raw yt-dlp search, reduced to the fields the filters and the videos table need
+def _ytsearch(query, max_results):
+    with yt_dlp.YoutubeDL(SEARCH_YDL_OPTS) as ydl:
+        entries = ydl.extract_info(f"ytsearch{max_results}:{query}", download=False)["entries"]
+    return [
+        {key: video.get(key) for key in SEARCH_ENTRY_FIELDS} | {
+            "automatic_captions": {lang: [] for lang in (video.get("automatic_captions") or {})}
+        } if video else None
+        for video in entries
+    ]
+
+# 🗄️ Search results with on-disk cache (keyed by query + max_results, expires after SEARCH_CACHE_TTL)
+def fetch_search_results(query, max_results=50, search=None, rate_limiter=None):
+    key = hashlib.sha1(f"{max_results}:{query}".encode("utf-8")).hexdigest()
+    cache_path = os.path.join(SEARCH_CACHE_DIR, f"{key}.json")
+    if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < SEARCH_CACHE_TTL:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)["entries"]
+
+    if rate_limiter:
+        rate_limiter.wait("https://www.youtube.com/results")
+    try:
+        with perf.timer("yt.search", items=1):
+            entries = (search or _ytsearch)(query, max_results)
+    except DownloadError as e:
+        if "Premieres in" in str(e):
+            print(f"⏩ Skipping premiere search result for: {query}")
+            return []
+        raise
+
+    os.makedirs(SEARCH_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"query": query, "max_results": max_results, "entries": entries}, f)
+    os.replace(tmp_path, cache_path)
+    return entries
+
+# 🎯 Apply the filter conditions to (cached) search results
+def filter_search_results(entries, min_views=MIN_VIEWS, min_duration=MIN_DURATION, languages=CAPTION_LANGUAGES):
+    for video in entries:
+        if not video or video.get("is_unavailable") or (video.get("age_limit") or 0) > 0:
+            print(f"🔒 Skipping inaccessible or age-restricted video: {(video or {}).get('id', 'unknown')}")
+            continue
+
+        video_id = video["id"]
+        title = video.get("title") or ""
+        duration = video.get("duration")
+        views = video.get("view_count") or 0
+        caps = video.get("automatic_captions") or {}
+
+        if (
+            views < min_views or
+            duration is None or duration < min_duration or
+            "review" not in title.lower() or
+            not any(lang in caps for lang in languages)
+        ):
+            print(f"⛔️ Skipping {video_id} ({title}) - Filtered out")
+            continue
+
+        yield video
+
+# 💾 Store filtered search results with lego_number (returns the IDs of the new videos)
+# concurrent searches can return the same video: the insert skips rows another worker stored in the meantime
+def store_search_results(conn, videos, lego_number):
+    rows = []
+    for video in videos:
+        video_id = video["id"]
+        if video_id in known_video_ids:
+            print(f"⚠️ Video {video_id} already exists, skipping...")
+            continue
+
+        caps = video.get("automatic_captions") or {}
+        transcript_available = "Ja" if caps else "Nein"
+        languages = ", ".join(caps.keys())
+
+        rows.append((video_id, video.get("title", ""), video["uploader"], video["upload_date"], video.get("view_count", 0),
+                     video["duration"], transcript_available, languages, lego_number))
+
+    new_ids = []
+    with conn, perf.timer("db.videos", items=len(rows)):
+        for row in rows:
+            if conn.execute("""
+                INSERT INTO videos (video_id, title, uploader, upload_date, views, duration, transcript, languages, lego_number)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(video_id) DO NOTHING
+            """, row).rowcount:
+                new_ids.append(row[0])
+    # only after the commit: ids of a failed insert must not count as known
+    with known_ids_lock:
+        known_video_ids.update(row[0] for row in rows)
+    return new_ids
 
 # 🔎 Search videos and store with lego_number
-def search_videos(query, lego_number, max_results=50):
-    ydl_opts = {
-        "quiet": True,
-        "sleep_interval": 3,
-        "max_sleep_interval": 4,
-    }
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+def search_videos(conn, query, lego_number, max_results=50):
+    entries = fetch_search_results(query, max_results)
+    store_search_results(conn, filter_search_results(entries), lego_number)
+
+# 🚦 Per-host rate limiting (shared by all workers)
+# watch pages, captions and searches all count against www.youtube.com, so the host sees at most one request per min_interval
+class HostRateLimiter:
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# ⚡ Search many sets in parallel; results are filtered and stored on the main thread
+def search_sets_concurrently(conn, sets, max_workers=SEARCH_WORKERS, max_results=50, min_interval=HOST_MIN_INTERVAL, search=None):
+    rate_limiter = HostRateLimiter(min_interval)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for number, name in sets:
+            query = f"LEGO {number} review"
+            print(f"🔍 Searching: {query}")
+            futures[pool.submit(fetch_search_results, query, max_results, search, rate_limiter)] = number
+        for future in as_completed(futures):
+            store_search_results(conn, filter_search_results(future.result()), lego_number=futures[future])
+
+# 🧩 Stream json3 captions: events are decoded one by one while the payload downloads
+_json_decoder = json.JSONDecoder()
+
+def iter_caption_segments(chunks):
+    """(start_ms, text) per non-empty caption event from json3 byte chunks, without holding the payload.
+
+    Auto-captions carry one seg per word; they are merged per event (a line of a few seconds), which is
+    fine enough for timestamp links and keeps the stored arrays small.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer, pos = "", 0
+
+    def read_more():
+        nonlocal buffer, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer, pos = buffer[pos:] + utf8.decode(chunk), 0
+        return True
+
+    # skip the header (pens, window styles, ...) up to the opening bracket of "events"
+    while (start := buffer.find('"events"', pos)) < 0:
+        pos = max(pos, len(buffer) - len('"events"'))  # the key may be split across two chunks
+        if not read_more():
+            return
+    pos = start + len('"events"')
+    while (bracket := buffer.find("[", pos)) < 0:
+        pos = len(buffer)
+        if not read_more():
+            return
+    pos = bracket + 1
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buffer):
+            if not read_more():
+                raise ValueError("json3 captions ended inside the events list")
+            continue
+        if buffer[pos] == "]":
+            return
         try:
-            results = ydl.extract_info(f"ytsearch{max_results}:{query}", download=False)["entries"]
-        except DownloadError as e:
-            if "Premieres in" in str(e):
-                print(f"⏩ Skipping premiere search result for: {query}")
-                return
-            else:
+            event, pos = _json_decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # event not complete yet, read on
+            if not read_more():
                 raise
+            continue
+        text = "".join(seg.get("utf8", "") for seg in event.get("segs", ())).replace("\n", " ").strip()
+        if text:
+            yield event.get("tStartMs", 0), text
 
-        for video in results:
-            if not video or video.get("is_unavailable") or video.get("age_limit", 0) > 0:
-                print(f"🔒 Skipping inaccessible or age-restricted video: {video.get('id', 'unknown')}")
-                continue
-
-            video_id = video["id"]
-            title = video.get("title", "")
-            duration = video.get("duration", 0)
-            views = video.get("view_count", 0)
-            caps = video.get("automatic_captions", {})
-
-            # 🎯 Filterbedingungen
-            if (
-                views < 500 or
-                duration is None or duration < 60 or
-                "review" not in title.lower() or
-                not any(lang in caps for lang in ["en", "de", "da", "fr", "it"])
-            ):
-                print(f"⛔️ Skipping {video_id} ({title}) - Filtered out")
-                continue
-
-            cursor.execute("SELECT COUNT(*) FROM videos WHERE video_id = ?", (video_id,))
-            if cursor.fetchone()[0] > 0:
-                print(f"⚠️ Video {video_id} already exists, skipping...")
-                continue
-
-            uploader = video["uploader"]
-            upload_date = video["upload_date"]
-            transcript_available = "Ja" if caps else "Nein"
-            languages = ", ".join(caps.keys())
-
-            cursor.execute("""
-                INSERT INTO videos (video_id, title, uploader, upload_date, views, duration, transcript, languages, lego_number)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (video_id, title, uploader, upload_date, views, duration, transcript_available, languages, lego_number))
+# 📋 Fetch description and English caption segments (no DB access)
+# returns (description, None, segments), (description, error text, None) or None if the video should be skipped
+@perf.timed("yt.transcript")
+def fetch_transcript(video_id, ydl, session=requests, rate_limiter=None):
+    watch_url = f"https://www.youtube.com/watch?v={video_id}"
+    try:
+        if rate_limiter:
+            rate_limiter.wait(watch_url)
+        video_info = ydl.extract_info(watch_url, download=False)
+
+        if video_info.get("age_limit", 0) > 0 or video_info.get("is_unavailable"):
+            print(f"🔒 Skipping restricted or unavailable video {video_id}")
+            return None
+
+        description = video_info.get("description", "No description available")
+        captions = video_info.get("automatic_captions", {})
+
+        if "en" not in captions:
+            print(f"⛔️ No English transcript for {video_id}, skipping...")
+            return None
+
+        # ✅ Load English transcript
+        url = captions["en"][0]["url"] + "&fmt=json3"
+        if rate_limiter:
+            rate_limiter.wait(url)
+        with session.get(url, timeout=CAPTION_TIMEOUT, stream=True) as response, perf.timer("yt.captions") as timing:
+            if response.status_code == 200:
+                segments = list(iter_caption_segments(response.iter_content(CAPTION_CHUNK_SIZE)))
+                timing.items = len(segments)
+                return description, None, segments
+        print(f"❌ Error downloading transcript for {video_id}")
+        transcript_text = "❌ Error downloading transcript"
 
-    conn.commit()
+    except DownloadError as de:
+        error_msg = str(de)
+        if "Sign in to confirm your age" in error_msg:
+            print(f"🔞 Skipping age-restricted video {video_id}")
+            return None
+        print(f"❌ DownloadError for {video_id}: {error_msg}")
+        transcript_text = f"DownloadError: {error_msg}"
+        description = "Download error"
+
+    except Exception as e:
+        print(f"❌ General error for {video_id}: {e}")
+        description = "Error loading video"
+        transcript_text = f"Error: {e}"
+
+    return description, transcript_text, None
 
 # 📋 Extract and store transcript
-def get_transcripts(video_id):
-    cursor.execute("SELECT COUNT(*) FROM video_details WHERE video_id = ?", (video_id,))
-    if cursor.fetchone()[0] > 0:
+def get_transcripts(conn, video_id):
+    if video_id in known_detail_ids:
         print(f"⚠️ Video {video_id} already exists in details, skipping...")
         return
 
-    ydl_opts = {
-        "quiet": True,
-        "writesubtitles": True,
-        "writeautomaticsub": True,
-        "subtitleslangs": ["en"],
-        "skip_download": True
-    }
+    with yt_dlp.YoutubeDL(TRANSCRIPT_YDL_OPTS) as ydl:
+        result = fetch_transcript(video_id, ydl)
+    if result is None:
+        return
+
+    # 📥 Save to DB only if transcript was attempted
+    with conn, perf.timer("db.transcripts", items=1):
+        storage.insert_transcripts(conn, [(video_id, *result)])
+    with known_ids_lock:
+        known_detail_ids.add(video_id)
+
+    print(f"✅ Stored transcript for video {video_id}")
+
+# ✍️ Single writer thread: batches inserts into video_details + transcripts (compressed)
+# videos count as stored once their batch is committed; an error is put into `failed` and stops the fetch
+def _transcript_writer(db_path, results, batch_size, failed):
+    def stored(rows):
+        with known_ids_lock:
+            known_detail_ids.update(row[0] for row in rows)
+        print(f"💾 Stored {len(rows)} transcripts")
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    try:
+        writer_conn = storage.connect(db_path)
         try:
-            video_info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+            with BatchedWriter(writer_conn, storage.insert_transcripts, batch_size, stored, name="db.transcripts") as writer:
+                while True:
+                    try:
+                        item = results.get(timeout=WRITER_FLUSH_INTERVAL)
+                    except queue.Empty:
+                        writer.flush()
+                        continue
+                    if item is None:
+                        break
+                    writer.add(item)
+        finally:
+            writer_conn.close()
+    except Exception as e:
+        print(f"❌ Transcript writer failed: {e}")
+        failed.append(e)
 
-            if video_info.get("age_limit", 0) > 0 or video_info.get("is_unavailable"):
-                print(f"🔒 Skipping restricted or unavailable video {video_id}")
-                return
+# ⚡ Fetch many transcripts concurrently (one YoutubeDL + requests.Session per worker)
+def fetch_transcripts_concurrently(video_ids, max_workers=TRANSCRIPT_WORKERS, min_interval=HOST_MIN_INTERVAL,
+                                   batch_size=WRITE_BATCH_SIZE, db_path=DB_PATH, ydl_factory=None):
+    ydl_factory = ydl_factory or (lambda: yt_dlp.YoutubeDL(TRANSCRIPT_YDL_OPTS))
+    rate_limiter = HostRateLimiter(min_interval)
+    local = threading.local()
+    opened = []
+    results = queue.Queue()
+    failed = []
 
-            description = video_info.get("description", "No description available")
-            captions = video_info.get("automatic_captions", {})
+    def work(video_id):
+        if failed or video_id in known_detail_ids:
+            return
+        if not hasattr(local, "ydl"):
+            local.ydl = ydl_factory()
+            local.session = requests.Session()
+            opened.append((local.ydl, local.session))
+        result = fetch_transcript(video_id, local.ydl, local.session, rate_limiter)
+        if result is not None:
+            results.put((video_id, *result))
 
-            if "en" not in captions:
-                print(f"⛔️ No English transcript for {video_id}, skipping...")
-                return
+    writer = threading.Thread(target=_transcript_writer, args=(db_path, results, batch_size, failed), daemon=True)
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(work, video_id) for video_id in video_ids]
+            for future in as_completed(futures):
+                future.result()
+                if failed:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    finally:
+        results.put(None)
+        writer.join()
+        for ydl, session in opened:
+            session.close()
+            ydl.close()
+    if failed:
+        raise failed[0]
 
-            # ✅ Load English transcript
-            url = captions["en"][0]["url"] + "&fmt=json3"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                segments = []
-                for event in data.get("events", []):
-                    for seg in event.get("segs", []):
-                        segments.append(seg.get("utf8", "").replace("\n", " "))
-                transcript_text = " ".join(segments).strip()
-            else:
-                print(f"❌ Error downloading transcript for {video_id}")
-                transcript_text = "❌ Error downloading transcript"
-
-        except DownloadError as de:
-            error_msg = str(de)
-            if "Sign in to confirm your age" in error_msg:
-                print(f"🔞 Skipping age-restricted video {video_id}")
-                return
-            else:
-                print(f"❌ DownloadError for {video_id}: {error_msg}")
-                transcript_text = f"DownloadError: {error_msg}"
-                description = "Download error"
-
-        except Exception as e:
-            print(f"❌ General error for {video_id}: {e}")
-            description = "Error loading video"
-            transcript_text = f"Error: {e}"
-
-        # 📥 Save to DB only if transcript was attempted
-        cursor.execute("""
-            INSERT INTO video_details (video_id, description, transcript)
-            VALUES (?, ?, ?)
-        """, (video_id, description, transcript_text))
-        conn.commit()
-
-        print(f"✅ Stored transcript for video {video_id}")
-
-# 📁 Load new LEGO sets
-load_legosets_from_csv("starwars_2025.csv")
-
-# 🔍 Suche nur für Sets ohne Videos
-cursor.execute("""
-    SELECT Number, SetName FROM legosets
-    WHERE LOWER(PackagingType) = 'box'
-    AND Number NOT IN (SELECT DISTINCT lego_number FROM videos)
-""")
-sets_to_search = cursor.fetchall()
-
-print(f"🔍 Searching for videos for {len(sets_to_search)} new LEGO sets...")
-for number, name in sets_to_search:
-    query = f"LEGO {number} review"
-    print(f"🔍 Searching: {query}")
-    search_videos(query, lego_number=number)
-
-# 📥 Retrieve and store transcripts
-cursor.execute("SELECT video_id FROM videos")
-video_ids = [row[0] for row in cursor.fetchall()]
-for video_id in video_ids:
-    get_transcripts(video_id)
-
-conn.close()
-elapsed_time = time.time() - start_time
-minutes = int(elapsed_time // 60)
-seconds = int(elapsed_time % 60)
-print(f"✅ All done! ⏱️ Script runtime: {minutes} min {seconds} sec")
+if __name__ == "__main__":
+    start_time = time.time()
+    conn = storage.connect(DB_PATH)
+    load_known_ids(conn)
+
+    # 📁 Load new LEGO sets (CSV paths from the command line, default: LEGOSET_CSV_FILES)
+    load_legosets_from_csv(conn, *(sys.argv[1:] or LEGOSET_CSV_FILES))
+
+    # 🔍 Suche nur für Sets ohne Videos
+    sets_to_search = conn.execute("""
+        SELECT Number, SetName FROM legosets
+        WHERE LOWER(PackagingType) = 'box'
+        AND Number NOT IN (SELECT DISTINCT lego_number FROM videos)
+    """).fetchall()
+
+    print(f"🔍 Searching for videos for {len(sets_to_search)} new LEGO sets with {SEARCH_WORKERS} workers...")
+    search_sets_concurrently(conn, sets_to_search)
+
+    # 📥 Retrieve and store transcripts (only videos without details)
+    video_ids = pending_transcript_ids()
+    print(f"📥 Fetching transcripts for {len(video_ids)} videos with {TRANSCRIPT_WORKERS} workers...")
+    fetch_transcripts_concurrently(video_ids)
+
+    conn.close()
+    perf.export("yt_extract")
+    elapsed_time = time.time() - start_time
+    minutes = int(elapsed_time // 60)
+    seconds = int(elapsed_time % 60)
+    print(f"✅ All done! ⏱️ Script runtime: {minutes} min {seconds} sec")